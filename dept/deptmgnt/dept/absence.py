@@ -0,0 +1,131 @@
+from datetime import date, timedelta
+
+import numpy as np
+from django.db import transaction
+
+from .models import AtRiskStudent, Attendance, StudentProfile
+
+PRESENT = 1
+ABSENT = 0
+NOT_MARKED = -1
+
+DEFAULT_LOOKBACK_DAYS = 60
+DEFAULT_RUN_LENGTH = 3
+DEFAULT_WINDOW = 10
+DEFAULT_THRESHOLD = 75.0
+DEFAULT_DROP = 20.0
+
+
+def attendance_matrix(classroom, start, end):
+    """Load a classroom's attendance as a students x class-days ``int8`` matrix.
+
+    Cells are ``PRESENT``, ``ABSENT`` or ``NOT_MARKED``. Columns are the days
+    on which any attendance was taken, so weekends and holidays drop out.
+    Returns ``(student_ids, days, matrix)`` from two flat queries.
+    """
+    student_ids = np.array(StudentProfile.objects.filter(
+        classroom=classroom,
+        is_approved=True
+    ).order_by('id').values_list('id', flat=True), dtype=np.int64)
+
+    rows = list(Attendance.objects.filter(
+        classroom=classroom,
+        student_id__in=student_ids.tolist(),
+        date__range=(start, end)
+    ).values_list('student_id', 'date', 'status').order_by())
+
+    if not rows or not len(student_ids):
+        return student_ids, [], np.full((len(student_ids), 0), NOT_MARKED, dtype=np.int8)
+
+    row_students, row_dates, row_statuses = zip(*rows)
+    ordinals = np.fromiter((day.toordinal() for day in row_dates), dtype=np.int64, count=len(rows))
+    day_ordinals, day_index = np.unique(ordinals, return_inverse=True)
+
+    matrix = np.full((len(student_ids), len(day_ordinals)), NOT_MARKED, dtype=np.int8)
+    matrix[np.searchsorted(student_ids, np.array(row_students)), day_index] = np.where(
+        np.array(row_statuses) == 'P', PRESENT, ABSENT
+    )
+    return student_ids, [date.fromordinal(int(day)) for day in day_ordinals], matrix
+
+
+def absence_runs(matrix):
+    """Return the current (trailing) and longest run of absences per student.
+
+    Days that were not marked neither extend nor break a run.
+    """
+    if not matrix.shape[1]:
+        zeros = np.zeros(matrix.shape[0], dtype=np.int64)
+        return zeros, zeros
+
+    # Absences so far minus absences up to the latest present day
+    total = np.cumsum(matrix == ABSENT, axis=1)
+    at_last_present = np.maximum.accumulate(np.where(matrix == PRESENT, total, 0), axis=1)
+    runs = total - at_last_present
+    return runs[:, -1], runs.max(axis=1)
+
+
+def rolling_rates(matrix, window):
+    """Attendance percentage over the last ``window`` class days and the window before it.
+
+    Rates are ``nan`` where a student has no marked day in the window.
+    """
+    present = np.concatenate(
+        [np.zeros((matrix.shape[0], 1)), np.cumsum(matrix == PRESENT, axis=1)], axis=1
+    )
+    marked = np.concatenate(
+        [np.zeros((matrix.shape[0], 1)), np.cumsum(matrix != NOT_MARKED, axis=1)], axis=1
+    )
+    days = matrix.shape[1]
+
+    def window_rate(end):
+        start = max(end - window, 0)
+        counted = marked[:, end] - marked[:, start]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counted > 0, (present[:, end] - present[:, start]) / counted * 100, np.nan)
+
+    return window_rate(days), window_rate(max(days - window, 0))
+
+
+def detect_chronic_absence(classroom, as_of=None, lookback_days=DEFAULT_LOOKBACK_DAYS,
+                           run_length=DEFAULT_RUN_LENGTH, window=DEFAULT_WINDOW,
+                           threshold=DEFAULT_THRESHOLD, drop=DEFAULT_DROP):
+    """Flag students of ``classroom`` at risk and replace its ``AtRiskStudent`` rows.
+
+    A student is flagged when currently absent for ``run_length`` or more
+    class days in a row, when their attendance over the last ``window`` class
+    days is below ``threshold`` percent, or when it fell by ``drop`` points
+    or more compared with the window before. Returns the flagged rows.
+    """
+    as_of = as_of or date.today()
+    student_ids, days, matrix = attendance_matrix(classroom, as_of - timedelta(days=lookback_days), as_of)
+    current_runs, longest_runs = absence_runs(matrix)
+    recent, previous = rolling_rates(matrix, window)
+
+    on_run = current_runs >= run_length
+    low = recent < threshold
+    falling = (previous - recent) >= drop
+
+    flagged = []
+    for i in np.flatnonzero(on_run | low | falling):
+        reasons = []
+        if on_run[i]:
+            reasons.append(f"Absent {current_runs[i]} class days in a row")
+        if low[i]:
+            reasons.append(f"{recent[i]:.0f}% attendance over the last {window} class days")
+        if falling[i]:
+            reasons.append(f"Attendance fell from {previous[i]:.0f}% to {recent[i]:.0f}%")
+        flagged.append(AtRiskStudent(
+            student_id=int(student_ids[i]),
+            classroom=classroom,
+            current_absence_run=int(current_runs[i]),
+            longest_absence_run=int(longest_runs[i]),
+            recent_rate=None if np.isnan(recent[i]) else round(float(recent[i]), 2),
+            previous_rate=None if np.isnan(previous[i]) else round(float(previous[i]), 2),
+            reason='; '.join(reasons)[:255],
+            detected_on=as_of
+        ))
+
+    with transaction.atomic():
+        AtRiskStudent.objects.filter(classroom=classroom).delete()
+        AtRiskStudent.objects.bulk_create(flagged)
+    return flagged
@@ -99,6 +99,56 @@ class LectureAdmin(admin.ModelAdmin):
                 obj.uploaded_by = request.user.staffprofile
         super().save_model(request, obj, form, change)
 
+@admin.register(AttendanceSummary)
+class AttendanceSummaryAdmin(admin.ModelAdmin):
+    list_display = ['student', 'classroom', 'month', 'present', 'total']
+    list_filter = ['classroom', 'month']
+    search_fields = ['student__roll_no']
+    readonly_fields = ['student', 'classroom', 'month', 'present', 'total']
+
+@admin.register(PerformanceReport)
+class PerformanceReportAdmin(admin.ModelAdmin):
+    list_display = ['department', 'classroom', 'requested_by', 'status', 'created_at', 'completed_at']
+    list_filter = ['department', 'status', 'created_at']
+    readonly_fields = ['created_at', 'completed_at', 'error']
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'priority', 'attempts', 'run_after', 'locked_by', 'created_at']
+    list_filter = ['status', 'task']
+    search_fields = ['task']
+    readonly_fields = ['created_at', 'updated_at', 'locked_by', 'locked_at', 'result', 'error']
+
+@admin.register(UnreadAnnouncementCounter)
+class UnreadAnnouncementCounterAdmin(admin.ModelAdmin):
+    list_display = ['student', 'classroom', 'unread']
+    list_filter = ['classroom']
+    search_fields = ['student__roll_no']
+
+@admin.register(AttendanceArchive)
+class AttendanceArchiveAdmin(admin.ModelAdmin):
+    list_display = ['student', 'classroom', 'academic_year', 'present_count', 'total_count', 'compacted_at']
+    list_filter = ['academic_year', 'classroom']
+    search_fields = ['student__roll_no']
+    exclude = ['marked', 'present']
+
+@admin.register(AtRiskStudent)
+class AtRiskStudentAdmin(admin.ModelAdmin):
+    list_display = ['student', 'classroom', 'current_absence_run', 'recent_rate', 'detected_on']
+    list_filter = ['classroom', 'detected_on']
+    search_fields = ['student__roll_no']
+
+@admin.register(LectureBlob)
+class LectureBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'references', 'created_at']
+    search_fields = ['name']
+
+@admin.register(LectureUpload)
+class LectureUploadAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'classroom', 'uploaded_by', 'received', 'size', 'status', 'updated_at']
+    list_filter = ['status', 'classroom']
+    search_fields = ['filename', 'title']
+
 @admin.register(AnnouncementRead)
 class AnnouncementReadAdmin(admin.ModelAdmin):
     list_display = ['announcement', 'student', 'read_at']
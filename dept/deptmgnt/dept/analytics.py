@@ -0,0 +1,118 @@
+import numpy as np
+
+from .models import Mark
+
+# Histogram buckets over percentage: 0-10, 10-20, ..., 90-100
+HISTOGRAM_EDGES = np.linspace(0, 100, 11)
+
+
+def load_mark_columns(department, classroom=None):
+    """Fetch the marks of approved students as columnar arrays in one query.
+
+    Returns ``(students, subjects, student_index, subject_index, percentage)``
+    where ``students`` and ``subjects`` are the distinct students
+    (``(id, roll_no, name)`` tuples) and subject names, and the three arrays
+    hold one entry per mark.
+    """
+    marks = Mark.objects.filter(
+        student__department=department,
+        student__is_approved=True
+    )
+    if classroom:
+        marks = marks.filter(classroom=classroom)
+    rows = list(marks.values_list(
+        'student_id', 'student__roll_no', 'student__user__first_name', 'student__user__last_name',
+        'subject', 'marks_obtained', 'maximum_marks'
+    ).order_by())
+
+    if not rows:
+        empty = np.empty(0, dtype=np.intp)
+        return [], [], empty, empty, np.empty(0)
+
+    student_ids, roll_nos, first_names, last_names, subjects, obtained, maximum = zip(*rows)
+    unique_ids, first_seen, student_index = np.unique(
+        np.array(student_ids), return_index=True, return_inverse=True
+    )
+    students = [
+        (int(unique_ids[i]), roll_nos[row], f"{first_names[row]} {last_names[row]}".strip())
+        for i, row in enumerate(first_seen)
+    ]
+    subject_names, subject_index = np.unique(np.array(subjects), return_inverse=True)
+    percentage = np.array(obtained, dtype=float) / np.array(maximum, dtype=float) * 100
+    return students, subject_names.tolist(), student_index, subject_index, percentage
+
+
+def subject_statistics(subjects, subject_index, percentage):
+    """Mean, median, standard deviation and histogram of every subject at once."""
+    n = len(subjects)
+    counts = np.bincount(subject_index, minlength=n)
+    means = np.bincount(subject_index, weights=percentage, minlength=n) / counts
+    variance = np.bincount(subject_index, weights=percentage ** 2, minlength=n) / counts - means ** 2
+    stds = np.sqrt(np.clip(variance, 0, None))
+
+    # Sort by subject, then score, so each subject's scores are a sorted slice
+    ordered = percentage[np.lexsort((percentage, subject_index))]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    medians = (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2
+    minimums = ordered[starts]
+    maximums = ordered[starts + counts - 1]
+
+    buckets = np.clip(np.digitize(percentage, HISTOGRAM_EDGES[1:-1]), 0, len(HISTOGRAM_EDGES) - 2)
+    histograms = np.bincount(
+        subject_index * (len(HISTOGRAM_EDGES) - 1) + buckets,
+        minlength=n * (len(HISTOGRAM_EDGES) - 1)
+    ).reshape(n, -1)
+
+    return [
+        {
+            'subject': subject,
+            'count': int(counts[i]),
+            'mean': round(float(means[i]), 2),
+            'median': round(float(medians[i]), 2),
+            'std': round(float(stds[i]), 2),
+            'min': round(float(minimums[i]), 2),
+            'max': round(float(maximums[i]), 2),
+            'histogram': histograms[i].tolist(),
+            'histogram_peak': int(histograms[i].max()),
+        }
+        for i, subject in enumerate(subjects)
+    ]
+
+
+def student_rankings(students, student_index, percentage):
+    """Average percentage, rank and percentile of every student, best first.
+
+    Tied averages share a rank (1, 2, 2, 4). The percentile is the share of
+    students below, counting ties as half.
+    """
+    n = len(students)
+    if not n:
+        return []
+    averages = np.bincount(student_index, weights=percentage, minlength=n) / np.bincount(student_index, minlength=n)
+    ranked = np.sort(averages)
+    below = np.searchsorted(ranked, averages, side='left')
+    not_above = np.searchsorted(ranked, averages, side='right')
+    ranks = n - not_above + 1
+    percentiles = (below + (not_above - below) / 2) / n * 100
+
+    return [
+        {
+            'student_id': students[i][0],
+            'roll_no': students[i][1],
+            'name': students[i][2],
+            'average': round(float(averages[i]), 2),
+            'rank': int(ranks[i]),
+            'percentile': round(float(percentiles[i]), 1),
+        }
+        for i in np.lexsort((np.arange(n), ranks))
+    ]
+
+
+def marks_analytics(department, classroom=None):
+    """Per-subject distributions and per-student standing for a department or class."""
+    students, subjects, student_index, subject_index, percentage = load_mark_columns(department, classroom)
+    return {
+        'histogram_edges': HISTOGRAM_EDGES.tolist(),
+        'subjects': subject_statistics(subjects, subject_index, percentage) if subjects else [],
+        'students': student_rankings(students, student_index, percentage),
+    }
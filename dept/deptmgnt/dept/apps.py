@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DeptConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dept'
+
+    def ready(self):
+        # Register the dashboard stats cache invalidation and photo thumbnail signals
+        from . import stats, thumbnails  # noqa: F401
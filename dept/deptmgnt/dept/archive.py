@@ -0,0 +1,343 @@
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Attendance, AttendanceArchive, AttendanceArchiveException
+from .pagination import DEFAULT_PAGE_SIZE, KeysetPage, make_cursor, page_size, read_cursor
+
+# Stand-in for an Attendance row read back from an archive
+ArchivedDay = namedtuple('ArchivedDay', ['id', 'date', 'status'])
+
+# Attendance ids per DELETE, well under every backend's parameter limit
+DELETE_BATCH_SIZE = 500
+
+
+def academic_year_of(day):
+    """Label of the academic year containing ``day``, such as ``'2024-25'``."""
+    year = day.year if day.month >= settings.ACADEMIC_YEAR_START_MONTH else day.year - 1
+    return f'{year}-{(year + 1) % 100:02d}'
+
+
+def is_closed(academic_year, today=None):
+    """Whether ``academic_year`` ended before the current one began."""
+    current = academic_year_of(today or timezone.localdate())
+    return academic_year_bounds(academic_year)[1] < academic_year_bounds(current)[0]
+
+
+def closed_academic_years(today=None):
+    """Closed academic years that still have ``Attendance`` rows, oldest first.
+
+    Years are taken from the attendance dates, not from
+    ``ClassRoom.academic_year``: a classroom keeps its row from one year to
+    the next.
+    """
+    current = academic_year_of(today or timezone.localdate())
+    months = Attendance.objects.filter(
+        date__lt=academic_year_bounds(current)[0]
+    ).dates('date', 'month')
+    return sorted({academic_year_of(month) for month in months})
+
+
+def academic_year_bounds(academic_year):
+    """First and last day of an academic year such as ``'2024-25'``.
+
+    Years start on the first of ``settings.ACADEMIC_YEAR_START_MONTH``.
+    Raises ``ValueError`` for labels that do not start with a year.
+    """
+    match = re.match(r'\s*(\d{4})', academic_year)
+    if not match:
+        raise ValueError(f'Unrecognised academic year: {academic_year!r}')
+    year = int(match.group(1))
+    first = date(year, settings.ACADEMIC_YEAR_START_MONTH, 1)
+    return first, first.replace(year=year + 1) - timedelta(days=1)
+
+
+def archive_end(archive):
+    """Last day covered by ``archive``."""
+    return archive.start_date + timedelta(days=archive.days - 1)
+
+
+def unpack(archive, exclude=None):
+    """Return the ``(marked, present)`` boolean arrays of ``archive``, one entry per day.
+
+    Days in ``exclude``, usually dates that have a live ``Attendance`` row
+    and so override the archive, are cleared in both arrays.
+    """
+    def bits(data):
+        return np.unpackbits(
+            np.frombuffer(bytes(data), dtype=np.uint8), count=archive.days, bitorder='little'
+        ).astype(bool)
+    marked, present = bits(archive.marked), bits(archive.present)
+    if exclude:
+        offsets = [(day - archive.start_date).days for day in exclude]
+        offsets = [offset for offset in offsets if 0 <= offset < archive.days]
+        marked[offsets] = False
+        present[offsets] = False
+    return marked, present
+
+
+def live_attendance_days(start=None, end=None, **filters):
+    """Dates with an ``Attendance`` row in classrooms that have archives.
+
+    Those rows win over archived days of the same date, so pass the result
+    on to ``archived_totals`` and ``archived_month_counts``. ``filters``
+    narrow the ``Attendance`` rows. Returns ``{(student_id, classroom_id): {date, ...}}``.
+    """
+    rows = Attendance.objects.filter(
+        classroom_id__in=AttendanceArchive.objects.values('classroom_id'),
+        **filters
+    )
+    if start:
+        rows = rows.filter(date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+
+    days = {}
+    for student_id, classroom_id, day in rows.values_list('student_id', 'classroom_id', 'date'):
+        days.setdefault((student_id, classroom_id), set()).add(day)
+    return days
+
+
+def archived_days(archive):
+    """Decode ``archive`` into ``ArchivedDay`` records, oldest first."""
+    marked, present = unpack(archive)
+    exceptions = {exception.date: exception.status for exception in archive.exceptions.all()}
+    days = []
+    for offset in np.flatnonzero(marked):
+        day = archive.start_date + timedelta(days=int(offset))
+        days.append(ArchivedDay(None, day, exceptions.get(day, 'P' if present[offset] else 'A')))
+    return days
+
+
+def attendance_page(student, classroom, cursor=None, per_page=DEFAULT_PAGE_SIZE):
+    """A page of a student's attendance in a classroom, archived and live, newest first.
+
+    Takes the same cursors as ``paginate_keyset(..., 'date', ...)``. Live
+    rows are read by a range scan from the cursor, and only the archives
+    reaching into the page are decoded. Live rows win over archived days
+    with the same date. Returns ``None`` when nothing is archived, so
+    callers can keep paging ``Attendance`` directly.
+    """
+    archives = list(AttendanceArchive.objects.filter(student=student, classroom=classroom))
+    if not archives:
+        return None
+
+    per_page = page_size(per_page)
+    position = read_cursor(cursor, Attendance, 'date')
+    direction, value = position[:2] if position else ('next', None)
+    newest_first = direction == 'next'
+
+    def in_page_direction(day):
+        return value is None or (day < value if newest_first else day > value)
+
+    live = Attendance.objects.filter(student=student, classroom=classroom)
+    if value is not None:
+        live = live.filter(**{'date__lt' if newest_first else 'date__gt': value})
+    records = {row.date: row for row in live.order_by('-date' if newest_first else 'date')[:per_page + 1]}
+
+    # Walk the archives away from the cursor, stopping once the page is
+    # filled with days closer to it than the next archive reaches
+    if newest_first:
+        archives = sorted((archive for archive in archives if in_page_direction(archive.start_date)),
+                          key=archive_end, reverse=True)
+    else:
+        archives = sorted((archive for archive in archives if in_page_direction(archive_end(archive))),
+                          key=lambda archive: archive.start_date)
+    for archive in archives:
+        nearest = sorted(records, reverse=newest_first)
+        if len(nearest) > per_page:
+            edge = nearest[per_page]
+            if (edge > archive_end(archive)) if newest_first else (edge < archive.start_date):
+                break
+        for day in archived_days(archive):
+            if in_page_direction(day.date):
+                records.setdefault(day.date, day)
+
+    rows = sorted(records.values(), key=lambda record: record.date, reverse=newest_first)
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if newest_first:
+        has_more, has_newer = more, value is not None
+    else:
+        rows.reverse()
+        has_more, has_newer = True, more
+
+    return KeysetPage(
+        rows,
+        next_cursor=make_cursor('next', rows[-1], 'date') if rows and has_more else None,
+        previous_cursor=make_cursor('prev', rows[0], 'date') if rows and has_newer else None
+    )
+
+
+def archived_totals(start=None, end=None, live_days=None, **filters):
+    """Present and total archived days per student, optionally within ``start``..``end``.
+
+    ``live_days`` (see ``live_attendance_days``) lists the dates that have a live
+    ``Attendance`` row; those days are left out so they are not counted
+    twice. ``filters`` narrow the ``AttendanceArchive`` rows, e.g.
+    ``student__department=department``. Returns ``{student_id: (present, total)}``.
+    """
+    archives = AttendanceArchive.objects.filter(**filters)
+    if end:
+        archives = archives.filter(start_date__lte=end)
+
+    totals = {}
+    for archive in archives.only('student_id', 'classroom_id', 'start_date', 'days', 'marked',
+                                 'present', 'present_count', 'total_count'):
+        live = (live_days or {}).get((archive.student_id, archive.classroom_id))
+        if start or end or live:
+            marked, present = unpack(archive, exclude=live)
+            first = max((start - archive.start_date).days, 0) if start else 0
+            last = (end - archive.start_date).days + 1 if end else archive.days
+            counted = (int(present[first:last].sum()), int(marked[first:last].sum()))
+        else:
+            counted = (archive.present_count, archive.total_count)
+        present_days, total_days = totals.get(archive.student_id, (0, 0))
+        totals[archive.student_id] = (present_days + counted[0], total_days + counted[1])
+    return totals
+
+
+def archived_month_counts(archives, live_days=None):
+    """Present and total archived days of ``archives`` per student, classroom and month.
+
+    Days listed in ``live_days`` (see ``live_attendance_days``) are left out, since
+    the live row wins. Returns ``{(student_id, classroom_id, month): (present, total)}``.
+    """
+    counts = {}
+    for archive in archives:
+        marked, present = unpack(
+            archive, exclude=(live_days or {}).get((archive.student_id, archive.classroom_id))
+        )
+        days = np.datetime64(archive.start_date, 'D') + np.arange(archive.days)
+        months, index = np.unique(days[marked].astype('datetime64[M]'), return_inverse=True)
+        totals = np.bincount(index, minlength=len(months))
+        presents = np.bincount(index, weights=present[marked], minlength=len(months))
+        for month, present_days, total_days in zip(months, presents, totals):
+            key = (archive.student_id, archive.classroom_id, month.astype('datetime64[D]').item())
+            previous = counts.get(key, (0, 0))
+            counts[key] = (previous[0] + int(present_days), previous[1] + int(total_days))
+    return counts
+
+
+@transaction.atomic
+def compact_classroom(classroom, academic_year):
+    """Fold a classroom's ``Attendance`` rows of ``academic_year`` into per-student archives and delete them.
+
+    Rows are chosen by date, whatever the classroom's current
+    ``academic_year`` label. Safe to re-run: rows written after an earlier
+    compaction are merged into the existing archives. The monthly
+    ``AttendanceSummary`` rows are kept, since they still describe the
+    archived days.
+
+    Returns ``(archives_written, rows_removed)``.
+    """
+    first_day, last_day = academic_year_bounds(academic_year)
+    # Locked until the rows are deleted, so a concurrent upsert waits
+    # rather than being deleted without being archived
+    rows = list(Attendance.objects.select_for_update().filter(
+        classroom=classroom,
+        date__gte=first_day,
+        date__lte=last_day
+    ).values_list(
+        'id', 'student_id', 'date', 'status', 'marked_by_id', 'created_at', 'updated_at'
+    ).order_by())
+    if not rows:
+        return 0, 0
+
+    existing = {
+        archive.student_id: archive
+        for archive in AttendanceArchive.objects.filter(
+            classroom=classroom,
+            academic_year=academic_year
+        ).prefetch_related('exceptions')
+    }
+
+    # Previously archived days first, so live rows override them
+    days = {}
+    exceptions = {}
+    for student_id, archive in existing.items():
+        for day in archived_days(archive):
+            days[student_id, day.date] = day.status
+        for exception in archive.exceptions.all():
+            exceptions[student_id, exception.date] = (exception.status, exception.marked_by_id, exception.updated_at)
+    for row_id, student_id, day, status, marked_by_id, created_at, updated_at in rows:
+        days[student_id, day] = status
+        exceptions.pop((student_id, day), None)
+        if status not in ('P', 'A') or updated_at.date() != created_at.date():
+            exceptions[student_id, day] = (status, marked_by_id, updated_at)
+
+    student_ids = np.array(sorted({student_id for student_id, day in days}), dtype=np.int64)
+    ordinals = np.array([day.toordinal() for student_id, day in days], dtype=np.int64)
+    start_ordinal = int(ordinals.min())
+    span = int(ordinals.max()) - start_ordinal + 1
+    start_date = min(day for student_id, day in days)
+
+    rows_index = np.searchsorted(student_ids, np.array([student_id for student_id, day in days]))
+    columns = ordinals - start_ordinal
+    marked = np.zeros((len(student_ids), span), dtype=bool)
+    present = np.zeros((len(student_ids), span), dtype=bool)
+    marked[rows_index, columns] = True
+    present[rows_index, columns] = np.array([status == 'P' for status in days.values()])
+
+    packed_marked = np.packbits(marked, axis=1, bitorder='little')
+    packed_present = np.packbits(present, axis=1, bitorder='little')
+    present_counts = present.sum(axis=1)
+    total_counts = marked.sum(axis=1)
+
+    archives = [
+        AttendanceArchive(
+            student_id=int(student_id),
+            classroom=classroom,
+            academic_year=academic_year,
+            start_date=start_date,
+            days=span,
+            marked=packed_marked[i].tobytes(),
+            present=packed_present[i].tobytes(),
+            present_count=int(present_counts[i]),
+            total_count=int(total_counts[i])
+        )
+        for i, student_id in enumerate(student_ids)
+    ]
+
+    AttendanceArchive.objects.bulk_create(
+        archives,
+        update_conflicts=True,
+        unique_fields=['student', 'classroom', 'academic_year'],
+        update_fields=['start_date', 'days', 'marked', 'present', 'present_count',
+                       'total_count', 'compacted_at']
+    )
+    archive_ids = dict(AttendanceArchive.objects.filter(
+        classroom=classroom,
+        academic_year=academic_year
+    ).values_list('student_id', 'id'))
+
+    AttendanceArchiveException.objects.filter(archive_id__in=archive_ids.values()).delete()
+    AttendanceArchiveException.objects.bulk_create([
+        AttendanceArchiveException(
+            archive_id=archive_ids[student_id],
+            date=day,
+            status=status,
+            marked_by_id=marked_by_id,
+            updated_at=updated_at
+        )
+        for (student_id, day), (status, marked_by_id, updated_at) in exceptions.items()
+    ], batch_size=1000)
+
+    # An explicit DELETE of exactly the rows packed above, without signals:
+    # the summaries already count these days, and post_delete would
+    # recount a month per row.
+    table = connection.ops.quote_name(Attendance._meta.db_table)
+    ids = [row[0] for row in rows]
+    removed = 0
+    with connection.cursor() as cursor:
+        for i in range(0, len(ids), DELETE_BATCH_SIZE):
+            batch = ids[i:i + DELETE_BATCH_SIZE]
+            cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(batch))})", batch)
+            removed += cursor.rowcount
+
+    return len(archives), removed
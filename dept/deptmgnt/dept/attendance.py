@@ -0,0 +1,108 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import Attendance, AttendanceSummary, StudentProfile
+from .stats import stats_cache, student_key
+
+VALID_STATUSES = {code for code, label in Attendance.STATUS_CHOICES}
+
+
+def parse_student_entries(entries):
+    """Parse ``"<student_id>:<status>"`` strings posted by the attendance page.
+
+    Returns ``(pairs, invalid)`` where ``pairs`` is a list of
+    ``(student_id, status)`` tuples and ``invalid`` lists the raw entries that
+    could not be parsed.
+    """
+    pairs = []
+    invalid = []
+    for entry in entries:
+        student_id, sep, status = entry.partition(':')
+        if not sep or not student_id.strip().isdigit():
+            invalid.append(entry)
+            continue
+        pairs.append((int(student_id), status.strip().upper()))
+    return pairs, invalid
+
+
+def bulk_mark_attendance(classroom, date, entries, marked_by=None):
+    """Write attendance for a whole class in a constant number of queries.
+
+    ``entries`` is an iterable of ``(student_id, status)`` pairs. The roster is
+    validated with a single query, then every valid row is upserted on the
+    ``(student, classroom, date)`` unique key inside one transaction, together
+    with the matching ``AttendanceSummary`` rows.
+
+    Returns a dict mapping each submitted student id to one of ``'created'``,
+    ``'updated'``, ``'invalid_status'`` or ``'not_in_class'``.
+    """
+    statuses = {}
+    for student_id, status in entries:
+        statuses[student_id] = status
+
+    roster = set(StudentProfile.objects.filter(
+        id__in=statuses.keys(),
+        classroom=classroom,
+        is_approved=True
+    ).values_list('id', flat=True))
+
+    results = {}
+    rows = []
+    for student_id, status in statuses.items():
+        if student_id not in roster:
+            results[student_id] = 'not_in_class'
+        elif status not in VALID_STATUSES:
+            results[student_id] = 'invalid_status'
+        else:
+            rows.append(Attendance(
+                student_id=student_id,
+                classroom=classroom,
+                date=date,
+                status=status,
+                marked_by=marked_by
+            ))
+
+    if not rows:
+        return results
+
+    with transaction.atomic():
+        existing = set(Attendance.objects.filter(
+            classroom=classroom,
+            date=date,
+            student_id__in=[row.student_id for row in rows]
+        ).values_list('student_id', flat=True))
+
+        Attendance.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['student', 'classroom', 'date'],
+            update_fields=['status', 'marked_by', 'updated_at']
+        )
+        # bulk_create skips post_save, so refresh the monthly rollup here
+        AttendanceSummary.refresh(classroom.id, date, [row.student_id for row in rows])
+        stats_cache.invalidate(*[student_key(row.student_id, classroom.id) for row in rows])
+
+    for row in rows:
+        results[row.student_id] = 'updated' if row.student_id in existing else 'created'
+
+    return results
+
+
+def roster_with_attendance(classroom, date):
+    """Load a classroom's approved students with their status for ``date``.
+
+    Students, their users and the attendance status come back in a single
+    query. Each student carries an ``attendance_status`` attribute
+    (``'P'``, ``'A'`` or ``None``).
+    """
+    status = Attendance.objects.filter(
+        student=OuterRef('pk'),
+        classroom=classroom,
+        date=date
+    ).values('status')[:1]
+    return list(StudentProfile.objects.filter(
+        classroom=classroom,
+        is_approved=True
+    ).select_related('user').annotate(
+        attendance_status=Subquery(status)
+    ).order_by('roll_no'))
@@ -0,0 +1,64 @@
+import os
+import time
+import zipfile
+
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class ZipSink:
+    """A write-only stream that collects what ``zipfile`` writes until drained.
+
+    It cannot seek, so ``zipfile`` follows each entry with a data descriptor
+    instead of going back to patch its header.
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+def unique_name(name, seen):
+    """Number a repeated archive name: ``a.pdf``, ``a (2).pdf``, ..."""
+    stem, extension = os.path.splitext(name)
+    candidate, n = name, 1
+    while candidate.lower() in seen:
+        n += 1
+        candidate = f'{stem} ({n}){extension}'
+    seen.add(candidate.lower())
+    return candidate
+
+
+def stream_zip(entries):
+    """Yield a ZIP archive of ``entries`` piece by piece.
+
+    ``entries`` are ``(arcname, path, size, modified)`` tuples; repeated
+    names are numbered. Entries are stored uncompressed, since lecture media
+    is mostly compressed already, and each file is read in small blocks
+    while the archive is sent, so nothing is staged on disk or held in
+    memory. Files over 4GB get ZIP64 records from their known size.
+    """
+    sink = ZipSink()
+    seen = set()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for arcname, path, size, modified in entries:
+            # ZIP timestamps start in 1980
+            modified = time.localtime(max(modified, 315619200))
+            info = zipfile.ZipInfo(unique_name(arcname, seen), date_time=modified[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = size
+            with open(path, 'rb') as source, archive.open(info, 'w') as dest:
+                for data in iter(lambda: source.read(COPY_BUFFER_SIZE), b''):
+                    dest.write(data)
+                    yield from sink.drain()
+            yield from sink.drain()
+    # Central directory
+    yield from sink.drain()
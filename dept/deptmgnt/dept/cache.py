@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import transaction
+
+MISSING = object()
+
+
+class TieredCache:
+    """An in-process LRU in front of Django's cache backend.
+
+    Local entries live for ``local_timeout`` seconds, which bounds how stale
+    another process can be after an invalidation. Concurrent misses for a key
+    are coalesced: within a process one thread computes while the others
+    wait, and across processes a lock in the shared cache lets only one
+    of them recompute.
+    """
+    def __init__(self, prefix, maxsize=1024, timeout=300, local_timeout=5, lock_timeout=10):
+        self.prefix = prefix
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.local_timeout = local_timeout
+        self.lock_timeout = lock_timeout
+        self._local = OrderedDict()
+        self._versions = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def shared_key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return MISSING
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._local[key]
+                return MISSING
+            self._local.move_to_end(key)
+            return value
+
+    def _set_local(self, key, value, version):
+        with self._lock:
+            # Skip values computed before an invalidation that arrived meanwhile
+            if self._versions.get(key, 0) != version:
+                return
+            self._local[key] = (time.monotonic() + self.local_timeout, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+    def _load_shared(self, key, compute, version):
+        shared_key = self.shared_key(key)
+        value = cache.get(shared_key, MISSING)
+        if value is not MISSING:
+            return value
+
+        lock_key = f'{shared_key}:lock'
+        locked = cache.add(lock_key, True, self.lock_timeout)
+        if not locked:
+            # Another process is computing; wait for its result
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = cache.get(shared_key, MISSING)
+                if value is not MISSING:
+                    return value
+            # The holder's lock has expired by now; take it over if we can
+            locked = cache.add(lock_key, True, self.lock_timeout)
+        try:
+            value = compute()
+            if self._versions.get(key, 0) == version:
+                cache.set(shared_key, value, self.timeout)
+        finally:
+            # Only release a lock this call holds
+            if locked:
+                cache.delete(lock_key)
+        return value
+
+    def get_or_set(self, key, compute):
+        """Return the cached value of ``key``, calling ``compute()`` on a miss."""
+        value = self._get_local(key)
+        if value is not MISSING:
+            return value
+
+        with self._lock:
+            version = self._versions.get(key, 0)
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            event.wait(self.lock_timeout)
+            value = self._get_local(key)
+            if value is not MISSING:
+                return value
+            return self._load_shared(key, compute, version)
+
+        try:
+            value = self._load_shared(key, compute, version)
+            self._set_local(key, value, version)
+            return value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    def invalidate(self, *keys):
+        """Drop ``keys`` from both tiers once the current transaction commits."""
+        def drop():
+            with self._lock:
+                for key in keys:
+                    self._local.pop(key, None)
+                    self._versions[key] = self._versions.get(key, 0) + 1
+            cache.delete_many([self.shared_key(key) for key in keys])
+        transaction.on_commit(drop)
+
+
+# Dashboard statistics, see dept.stats
+stats_cache = TieredCache('dept:stats')
@@ -0,0 +1,32 @@
+from asyncio import iscoroutinefunction
+from functools import wraps
+
+from django.contrib.auth.views import redirect_to_login
+
+
+def role_required(*roles):
+    """Allow the view only for users whose ``request.role`` is in ``roles``.
+
+    Relies on ``RoleMiddleware``. HODs are staff, so ``'staff'`` admits them
+    too. Other users are sent to the login page, like ``user_passes_test``.
+    Works on both sync and async views.
+    """
+    allowed = set(roles)
+    if 'staff' in allowed:
+        allowed.add('hod')
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped_view(request, *args, **kwargs):
+                if getattr(request, 'role', None) in allowed:
+                    return await view_func(request, *args, **kwargs)
+                return redirect_to_login(request.get_full_path())
+        else:
+            @wraps(view_func)
+            def _wrapped_view(request, *args, **kwargs):
+                if getattr(request, 'role', None) in allowed:
+                    return view_func(request, *args, **kwargs)
+                return redirect_to_login(request.get_full_path())
+        return _wrapped_view
+    return decorator
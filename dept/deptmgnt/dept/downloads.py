@@ -0,0 +1,145 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from .storage import BLOB_DIR
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """A read-only window of ``length`` bytes of an open file, starting at ``start``.
+
+    Exposes ``fileno`` and ``tell`` so servers with a sendfile-capable
+    ``wsgi.file_wrapper`` send the window straight from the page cache.
+    """
+    def __init__(self, f, start, length):
+        f.seek(start)
+        self.file = f
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(name, size, modified):
+    # Blob names are content digests, which makes a strong validator
+    if name.startswith(f'{BLOB_DIR}/'):
+        return '"%s"' % os.path.splitext(os.path.basename(name))[0]
+    return '"%x-%x"' % (int(modified), size)
+
+
+def parse_range(header, size):
+    """Return the ``(start, end)`` byte positions of a single-range ``Range`` header.
+
+    ``end`` is inclusive. Returns ``None`` for headers that should be
+    ignored, including multi-range requests, and raises ``ValueError`` when
+    the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if not length:
+            raise ValueError('Empty suffix range')
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start > end:
+        if last and int(last) < start:
+            return None
+        raise ValueError('Range starts past the end of the file')
+    return start, end
+
+
+def if_range_matches(request, etag, modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(modified)
+
+
+def serve_file(request, storage, name, filename, as_attachment=False):
+    """Send a stored file with validators, byte ranges and optional sendfile offload.
+
+    ``settings.PROTECTED_MEDIA_SENDFILE`` selects who transfers the bytes:
+    ``'x-accel-redirect'`` (nginx, via an internal location at
+    ``PROTECTED_MEDIA_INTERNAL_URL``), ``'x-sendfile'`` (Apache, lighttpd)
+    or ``None`` to stream from Django. Callers check access first.
+    """
+    path = storage.path(name)
+    stat = os.stat(path)
+    etag = file_etag(name, stat.st_size, stat.st_mtime)
+    validators = {'ETag': etag, 'Last-Modified': http_date(stat.st_mtime)}
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        for header, value in validators.items():
+            not_modified.headers[header] = value
+        return not_modified
+
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    disposition = content_disposition_header(as_attachment, filename)
+
+    sendfile = settings.PROTECTED_MEDIA_SENDFILE
+    if sendfile:
+        # The front server answers Range requests itself
+        response = HttpResponse(content_type=content_type)
+        if sendfile == 'x-accel-redirect':
+            # nginx decodes the URI, so names with spaces or '%' must be escaped
+            response.headers['X-Accel-Redirect'] = settings.PROTECTED_MEDIA_INTERNAL_URL + quote(name)
+        else:
+            response.headers['X-Sendfile'] = path
+    else:
+        start, end = 0, stat.st_size - 1
+        status = 200
+        range_header = request.headers.get('Range')
+        if range_header and if_range_matches(request, etag, stat.st_mtime):
+            try:
+                byte_range = parse_range(range_header, stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response.headers['Content-Range'] = f'bytes */{stat.st_size}'
+                return response
+            if byte_range:
+                start, end = byte_range
+                status = 206
+
+        f = open(path, 'rb')
+        response = FileResponse(FileRange(f, start, end - start + 1), status=status,
+                                content_type=content_type)
+        response.headers['Content-Length'] = end - start + 1
+        if status == 206:
+            response.headers['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Content-Disposition'] = disposition
+    for header, value in validators.items():
+        response.headers[header] = value
+    # Lectures only change by being re-uploaded, but access must be rechecked
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -1,4 +1,8 @@
+import os
+
 from django import forms
+from django.conf import settings
+from django.utils.text import get_valid_filename
 from django.contrib.auth.models import User
 from .models import *
 
@@ -53,11 +57,12 @@ class MarksEntryForm(forms.ModelForm):
     
     def __init__(self, staff, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        classroom_ids = staff.classroom_ids()
         self.fields['student'].queryset = StudentProfile.objects.filter(
-            classroom__in=staff.classes.all(),
+            classroom_id__in=classroom_ids,
             is_approved=True
-        )
-        self.fields['classroom'].queryset = staff.classes.all()
+        ).select_related('user')
+        self.fields['classroom'].queryset = ClassRoom.objects.filter(id__in=classroom_ids)
 
 class AnnouncementForm(forms.ModelForm):
     class Meta:
@@ -69,7 +74,31 @@ class AnnouncementForm(forms.ModelForm):
     
     def __init__(self, staff, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['classroom'].queryset = staff.classes.all()
+        self.fields['classroom'].queryset = ClassRoom.objects.filter(id__in=staff.classroom_ids())
+
+class LectureUploadForm(forms.ModelForm):
+    """Starts a chunked upload; the file itself arrives afterwards."""
+    class Meta:
+        model = LectureUpload
+        fields = ['title', 'description', 'classroom', 'filename', 'size']
+    
+    def __init__(self, staff, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['classroom'].queryset = ClassRoom.objects.filter(id__in=staff.classroom_ids())
+    
+    def clean_filename(self):
+        filename = get_valid_filename(os.path.basename(self.cleaned_data['filename']))
+        if not filename:
+            raise forms.ValidationError('Invalid file name.')
+        return filename
+    
+    def clean_size(self):
+        size = self.cleaned_data['size']
+        if not 0 < size <= settings.LECTURE_MAX_UPLOAD_SIZE:
+            raise forms.ValidationError(
+                f'Files must be between 1 byte and {settings.LECTURE_MAX_UPLOAD_SIZE // (1024 * 1024)} MB.'
+            )
+        return size
 
 class LectureForm(forms.ModelForm):
     class Meta:
@@ -81,5 +110,5 @@ class LectureForm(forms.ModelForm):
     
     def __init__(self, staff, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['classroom'].queryset = staff.classes.all()
+        self.fields['classroom'].queryset = ClassRoom.objects.filter(id__in=staff.classroom_ids())
 
@@ -0,0 +1,57 @@
+# Thumbnail rendering for profile photos.
+#
+# Like dept.pdf, this module must not import Django models: the backfill
+# command runs it in spawned worker processes.
+import os
+import tempfile
+
+from PIL import Image, ImageOps
+
+# Rendered at 40px in the rosters; twice that for high-density screens
+THUMBNAIL_SIZE = (96, 96)
+
+# Extension -> (Pillow format, save options). WebP for browsers that
+# accept it, JPEG for the rest.
+THUMBNAIL_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def thumbnail_name(name, extension):
+    """Name of a thumbnail stored beside ``name``: ``a/b.jpg`` -> ``a/b.jpg.thumb.webp``.
+
+    The photo's own extension is kept, so ``a/b.jpg`` and ``a/b.png`` get
+    different thumbnails.
+    """
+    return f'{name}.thumb.{extension}'
+
+
+def make_thumbnails(path, size=THUMBNAIL_SIZE, mode=0o644):
+    """Write every thumbnail of the image at ``path`` next to it and return their paths.
+
+    Each file is written to a temporary name and renamed into place, so a
+    thumbnail is never seen half written. ``mode`` is applied like
+    ``FILE_UPLOAD_PERMISSIONS``.
+    """
+    with Image.open(path) as image:
+        # Let the JPEG decoder downscale while decoding multi-megapixel photos
+        image.draft('RGB', (size[0] * 2, size[1] * 2))
+        image = ImageOps.exif_transpose(image)
+        image = ImageOps.fit(image.convert('RGB'), size, Image.Resampling.LANCZOS)
+
+    written = []
+    for extension, (image_format, options) in THUMBNAIL_FORMATS.items():
+        target = thumbnail_name(path, extension)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, image_format, **options)
+            if mode is not None:
+                os.chmod(temp_path, mode)
+            os.replace(temp_path, target)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        written.append(target)
+    return written
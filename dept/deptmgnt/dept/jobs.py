@@ -0,0 +1,111 @@
+import traceback
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+
+def enqueue(task, priority=0, max_attempts=3, run_after=None, created_by=None, **payload):
+    """Queue ``task`` (a dotted path to a function) to run with ``payload`` as kwargs.
+
+    The job row is written in the caller's transaction, so it only becomes
+    visible to workers once that transaction commits.
+    """
+    import_string(task)  # Fail fast on typos rather than in the worker
+    return Job.objects.create(
+        task=task,
+        payload=payload,
+        priority=priority,
+        max_attempts=max_attempts,
+        run_after=run_after or timezone.now(),
+        created_by=created_by
+    )
+
+
+def get_job(job_id):
+    return Job.objects.filter(id=job_id).first()
+
+
+def _ready_jobs():
+    return Job.objects.filter(
+        status='queued',
+        run_after__lte=timezone.now()
+    ).order_by('-priority', 'run_after', 'id')
+
+
+def claim_job(worker_name):
+    """Lock the next ready job for ``worker_name`` and mark it running.
+
+    Uses ``SELECT ... FOR UPDATE SKIP LOCKED`` where the database supports it.
+    Otherwise (SQLite) a conditional UPDATE acts as a compare-and-swap, so two
+    workers can never claim the same row.
+    """
+    now = timezone.now()
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = _ready_jobs().select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status = 'running'
+            job.attempts += 1
+            job.locked_by = worker_name
+            job.locked_at = now
+            job.save(update_fields=['status', 'attempts', 'locked_by', 'locked_at', 'updated_at'])
+            return job
+
+    for job_id in _ready_jobs().values_list('id', flat=True)[:10]:
+        claimed = Job.objects.filter(id=job_id, status='queued').update(
+            status='running',
+            attempts=F('attempts') + 1,
+            locked_by=worker_name,
+            locked_at=now,
+            updated_at=now
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Execute a claimed job and record its outcome, scheduling a retry on failure."""
+    try:
+        result = import_string(job.task)(**job.payload)
+    except Exception:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            # Exponential backoff: 30s, 60s, 120s, ...
+            job.status = 'queued'
+            job.run_after = timezone.now() + timedelta(seconds=30 * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+    else:
+        job.status = 'done'
+        job.result = result
+        job.error = ''
+
+    job.locked_by = ''
+    job.locked_at = None
+    job.save()
+    return job
+
+
+def requeue_stale_jobs(timeout):
+    """Put back jobs whose worker died while running them.
+
+    Jobs that have already used up their attempts are marked failed instead.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status='running',
+        locked_at__lt=now - timedelta(seconds=timeout)
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', error='Worker stopped while running this job',
+        locked_by='', locked_at=None, updated_at=now
+    )
+    return stale.update(status='queued', locked_by='', locked_at=None, updated_at=now)
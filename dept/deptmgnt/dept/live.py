@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Announcement
+
+KEEPALIVE_SECONDS = 15
+
+logger = logging.getLogger(__name__)
+
+
+def announcement_payload(announcement):
+    return {
+        'id': announcement.id,
+        'title': announcement.title,
+        'content': announcement.content,
+        'important': announcement.important,
+        'created_at': announcement.created_at.isoformat(),
+        'created_by': announcement.created_by.user.get_full_name(),
+    }
+
+
+@sync_to_async
+def fetch_announcements_after(classroom_id, last_id, limit=100):
+    return [
+        announcement_payload(announcement)
+        for announcement in Announcement.objects.filter(
+            classroom_id=classroom_id,
+            id__gt=last_id
+        ).select_related('created_by__user').order_by('id')[:limit]
+    ]
+
+
+@sync_to_async
+def latest_announcement_id(classroom_id):
+    latest = Announcement.objects.filter(classroom_id=classroom_id).order_by('-id').first()
+    return latest.id if latest else 0
+
+
+class ClassroomChannel:
+    """Subscribers of one classroom, fed by a single polling task."""
+    def __init__(self, classroom_id):
+        self.classroom_id = classroom_id
+        self.subscribers = set()
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    async def run(self, poll_interval):
+        last_id = None
+        while self.subscribers:
+            if last_id is not None:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+
+            # A failed query must not stop the feed for every subscriber
+            try:
+                if last_id is None:
+                    last_id = await latest_announcement_id(self.classroom_id)
+                    continue
+                for payload in await fetch_announcements_after(self.classroom_id, last_id):
+                    last_id = payload['id']
+                    for queue in self.subscribers:
+                        queue.put_nowait(payload)
+            except Exception:
+                logger.exception('Polling announcements for classroom %s failed', self.classroom_id)
+                if last_id is None:
+                    await asyncio.sleep(poll_interval)
+
+
+class AnnouncementBroadcaster:
+    """In-process pub/sub for new announcements.
+
+    However many clients are connected for a classroom, the database is
+    polled once per interval for that classroom. Saves made in this process
+    wake the poller immediately.
+    """
+    def __init__(self):
+        self.channels = {}
+        self.loop = None
+
+    @property
+    def poll_interval(self):
+        return getattr(settings, 'ANNOUNCEMENT_POLL_INTERVAL', 5)
+
+    def subscribe(self, classroom_id):
+        self.loop = asyncio.get_running_loop()
+        channel = self.channels.get(classroom_id)
+        if channel is None or channel.task is None or channel.task.done():
+            channel = self.channels[classroom_id] = ClassroomChannel(classroom_id)
+        queue = asyncio.Queue()
+        channel.subscribers.add(queue)
+        if channel.task is None:
+            channel.task = asyncio.create_task(channel.run(self.poll_interval))
+        return queue
+
+    def unsubscribe(self, classroom_id, queue):
+        channel = self.channels.get(classroom_id)
+        if channel is None:
+            return
+        channel.subscribers.discard(queue)
+        if not channel.subscribers:
+            channel.wakeup.set()  # Let the poller notice and exit
+            del self.channels[classroom_id]
+
+    def notify(self, classroom_id):
+        """Wake the classroom's poller; safe to call from any thread."""
+        channel = self.channels.get(classroom_id)
+        if channel is not None and self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(channel.wakeup.set)
+
+
+broadcaster = AnnouncementBroadcaster()
+
+
+@receiver(post_save, sender=Announcement)
+def wake_announcement_stream(sender, instance, created, **kwargs):
+    if created:
+        broadcaster.notify(instance.classroom_id)
+
+
+def sse_event(payload):
+    return f"id: {payload['id']}\nevent: announcement\ndata: {json.dumps(payload)}\n\n"
+
+
+async def announcement_batch(classroom_id, last_event_id=None):
+    """One-shot Server-Sent Events body for servers that cannot hold a stream open.
+
+    Sends what was missed since ``last_event_id`` and a ``retry:`` hint; a
+    first connection only gets the latest id, so its next reconnect asks
+    for what came after it.
+    """
+    retry = f"retry: {settings.ANNOUNCEMENT_RETRY_SECONDS * 1000}\n\n"
+    if last_event_id is None:
+        return f"id: {await latest_announcement_id(classroom_id)}\n\n" + retry
+    return ''.join(
+        sse_event(payload) for payload in await fetch_announcements_after(classroom_id, last_event_id)
+    ) + retry
+
+
+async def announcement_events(classroom_id, last_event_id=None):
+    """Yield Server-Sent Events for announcements created in the classroom.
+
+    With ``last_event_id`` (a reconnecting browser) anything missed since
+    that announcement is sent first.
+    """
+    queue = broadcaster.subscribe(classroom_id)
+    try:
+        seen = 0
+        if last_event_id is not None:
+            for payload in await fetch_announcements_after(classroom_id, last_event_id):
+                seen = payload['id']
+                yield sse_event(payload)
+
+        yield f"retry: {broadcaster.poll_interval * 1000}\n\n"
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if payload['id'] > seen:
+                seen = payload['id']
+                yield sse_event(payload)
+    finally:
+        broadcaster.unsubscribe(classroom_id, queue)
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from dept.models import LectureUpload
+from dept.uploads import abort_upload
+
+class Command(BaseCommand):
+    help = 'Remove chunked lecture uploads that were abandoned before finishing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=24,
+                            help='Hours since the last chunk arrived (default: 24)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than'])
+        stale = LectureUpload.objects.filter(status='uploading', updated_at__lt=cutoff)
+        
+        removed = 0
+        for upload in stale.iterator():
+            abort_upload(upload)
+            removed += 1
+        
+        # Finished uploads only record which lecture they became
+        LectureUpload.objects.filter(status='complete', updated_at__lt=cutoff).delete()
+        
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} abandoned upload(s)'))
@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from dept.models import Lecture, LectureBlob
+from dept.storage import BLOB_DIR, lecture_storage
+
+class Command(BaseCommand):
+    help = 'Recount lecture blob references and delete blobs no lecture refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=24,
+                            help='Keep unreferenced blobs younger than this many hours (default: 24), '
+                                 'since an upload stores its blob before the lecture is saved')
+        parser.add_argument('--import-existing', action='store_true',
+                            help='First move lecture files stored before deduplication into the blob store')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be removed without removing it')
+
+    def handle(self, *args, **options):
+        if options['import_existing'] and not options['dry_run']:
+            self.import_existing()
+
+        counts = dict(Lecture.objects.filter(
+            file__startswith=f'{BLOB_DIR}/'
+        ).values('file').annotate(n=Count('id')).values_list('file', 'n'))
+
+        cutoff = timezone.now() - timedelta(hours=options['grace'])
+        orphans = [
+            name for name in lecture_storage.blob_names()
+            if name not in counts and lecture_storage.get_modified_time(name) < cutoff
+        ]
+        # Leftovers of interrupted saves
+        temporary = [
+            f'{BLOB_DIR}/{name}' for name in lecture_storage.listdir(BLOB_DIR)[1]
+            if name.endswith('.tmp') and lecture_storage.get_modified_time(f'{BLOB_DIR}/{name}') < cutoff
+        ] if lecture_storage.exists(BLOB_DIR) else []
+        freed = sum(lecture_storage.size(name) for name in orphans)
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(orphans)} orphaned blob(s), {freed} bytes')
+            return
+
+        with transaction.atomic():
+            LectureBlob.objects.bulk_create(
+                [LectureBlob(name=name, size=lecture_storage.size(name), references=n)
+                 for name, n in counts.items()],
+                update_conflicts=True,
+                unique_fields=['name'],
+                update_fields=['references'],
+                batch_size=1000
+            )
+            LectureBlob.objects.exclude(name__in=counts.keys()).update(references=0)
+            LectureBlob.objects.filter(name__in=orphans).delete()
+
+        for name in orphans + temporary:
+            lecture_storage.purge(name)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Removed {len(orphans)} orphaned blob(s), freed {freed} bytes')
+        )
+
+    def import_existing(self):
+        imported = 0
+        for lecture in Lecture.objects.exclude(file='').exclude(file__startswith=f'{BLOB_DIR}/'):
+            legacy = lecture.file.name
+            if not lecture_storage.exists(legacy):
+                continue
+            with lecture_storage.open(legacy) as f:
+                lecture.file.save(legacy, File(f), save=False)
+            if not lecture.filename:
+                lecture.filename = legacy.rsplit('/', 1)[-1]
+            lecture.save(update_fields=['file', 'filename'])
+            lecture_storage.purge(legacy)
+            imported += 1
+        self.stdout.write(f'Imported {imported} existing lecture file(s)')
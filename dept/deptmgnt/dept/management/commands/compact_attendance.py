@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dept.archive import academic_year_bounds, academic_year_of, closed_academic_years, compact_classroom, is_closed
+from dept.models import ClassRoom
+
+class Command(BaseCommand):
+    help = 'Pack the attendance of closed academic years into per-student bitset archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--academic-year', action='append',
+                            help='Compact this academic year (repeatable); defaults to every closed year')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='List the classrooms that would be compacted')
+
+    def handle(self, *args, **options):
+        years = []
+        for year in options['academic_year'] or closed_academic_years():
+            try:
+                # Accept '2024-2025' as well as '2024-25'
+                years.append(academic_year_of(academic_year_bounds(year)[0]))
+            except ValueError as e:
+                raise CommandError(str(e))
+        still_open = [year for year in years if not is_closed(year)]
+        if still_open:
+            raise CommandError(f"Academic year(s) still open: {', '.join(sorted(still_open))}")
+
+        # Classrooms carry over from year to year, so pick them by attendance dates
+        work = [
+            (year, classroom)
+            for year in sorted(set(years))
+            for classroom in ClassRoom.objects.filter(
+                attendance__date__range=academic_year_bounds(year)
+            ).distinct().order_by('id')
+        ]
+        if options['dry_run']:
+            for year, classroom in work:
+                self.stdout.write(f'{year}: {classroom.name}')
+            return
+
+        archived = removed = 0
+        for year, classroom in work:
+            written, deleted = compact_classroom(classroom, year)
+            archived += written
+            removed += deleted
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {archived} archive(s) and removed {removed} attendance row(s)'
+        ))
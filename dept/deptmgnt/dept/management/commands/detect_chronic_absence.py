@@ -0,0 +1,57 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from dept.absence import (
+    DEFAULT_DROP, DEFAULT_LOOKBACK_DAYS, DEFAULT_RUN_LENGTH, DEFAULT_THRESHOLD,
+    DEFAULT_WINDOW, detect_chronic_absence
+)
+from dept.models import ClassRoom
+
+class Command(BaseCommand):
+    help = 'Flag students with chronic absences; meant to run nightly (e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classroom', type=int, action='append',
+                            help='Only check this classroom id (repeatable)')
+        parser.add_argument('--as-of', help='Evaluate as of this date (YYYY-MM-DD), default today')
+        parser.add_argument('--lookback-days', type=int, default=DEFAULT_LOOKBACK_DAYS,
+                            help='Calendar days of attendance to load')
+        parser.add_argument('--run-length', type=int, default=DEFAULT_RUN_LENGTH,
+                            help='Flag this many consecutive absences')
+        parser.add_argument('--window', type=int, default=DEFAULT_WINDOW,
+                            help='Class days in the rolling attendance window')
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='Flag a rolling attendance percentage below this')
+        parser.add_argument('--drop', type=float, default=DEFAULT_DROP,
+                            help='Flag a fall of this many points between two windows')
+
+    def handle(self, *args, **options):
+        as_of = date.today()
+        if options['as_of']:
+            as_of = parse_date(options['as_of'])
+            if as_of is None:
+                raise CommandError('--as-of must be a date in YYYY-MM-DD format')
+
+        classrooms = ClassRoom.objects.order_by('id')
+        if options['classroom']:
+            classrooms = classrooms.filter(id__in=options['classroom'])
+
+        started = time.monotonic()
+        flagged = 0
+        for classroom in classrooms:
+            flagged += len(detect_chronic_absence(
+                classroom,
+                as_of=as_of,
+                lookback_days=options['lookback_days'],
+                run_length=options['run_length'],
+                window=options['window'],
+                threshold=options['threshold'],
+                drop=options['drop']
+            ))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Flagged {flagged} student(s) at risk in {time.monotonic() - started:.2f}s'
+        ))
@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from dept.images import make_thumbnails
+from dept.thumbnails import PROFILE_MODELS, mark_thumbnails_ready
+
+class Command(BaseCommand):
+    help = 'Generate missing profile photo thumbnails across a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes (default: one per CPU)')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate thumbnails that already exist')
+
+    def handle(self, *args, **options):
+        photos = []
+        for kind, model in PROFILE_MODELS.items():
+            profiles = model.objects.exclude(photo='').exclude(photo__isnull=True)
+            if not options['force']:
+                profiles = profiles.exclude(thumbnail_of=F('photo'))
+            photos.extend((model, pk, name) for pk, name in profiles.values_list('id', 'photo'))
+
+        if not photos:
+            self.stdout.write('No photos need thumbnails')
+            return
+
+        storage = PROFILE_MODELS['student']._meta.get_field('photo').storage
+        done = failed = 0
+        # Workers only run Pillow, so spawn them rather than fork a process
+        # that holds database connections.
+        with ProcessPoolExecutor(
+            max_workers=max(1, min(options['workers'], len(photos))),
+            mp_context=multiprocessing.get_context('spawn')
+        ) as pool:
+            futures = {
+                pool.submit(make_thumbnails, storage.path(name), mode=settings.FILE_UPLOAD_PERMISSIONS): (model, pk, name)
+                for model, pk, name in photos
+            }
+            for future in as_completed(futures):
+                model, pk, name = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'{name}: {e}')
+                    continue
+                mark_thumbnails_ready(model, pk, name)
+                done += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Generated thumbnails for {done} photo(s), {failed} failed')
+        )
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from dept.archive import archived_month_counts, live_attendance_days
+from dept.models import Attendance, AttendanceArchive, AttendanceSummary
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly attendance summary table from raw and archived attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of summary rows inserted per query')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        counts = Attendance.objects.annotate(
+            month=TruncMonth('date')
+        ).values('student_id', 'classroom_id', 'month').annotate(
+            total_days=Count('id'),
+            present_days=Count('id', filter=Q(status='P'))
+        ).order_by()
+        
+        # Compacted classrooms keep few live rows, so their dates fit in memory
+        archives = AttendanceArchive.objects.only(
+            'student_id', 'classroom_id', 'start_date', 'days', 'marked', 'present'
+        )
+        archived = archived_month_counts(archives.iterator(chunk_size=batch_size), live_attendance_days())
+        
+        created = 0
+        with transaction.atomic():
+            AttendanceSummary.objects.all().delete()
+            
+            def rows():
+                for row in counts.iterator(chunk_size=batch_size):
+                    present, total = archived.pop(
+                        (row['student_id'], row['classroom_id'], row['month']), (0, 0)
+                    )
+                    yield (row['student_id'], row['classroom_id'], row['month'],
+                           row['present_days'] + present, row['total_days'] + total)
+                for (student_id, classroom_id, month), (present, total) in archived.items():
+                    yield student_id, classroom_id, month, present, total
+            
+            batch = []
+            for student_id, classroom_id, month, present, total in rows():
+                batch.append(AttendanceSummary(
+                    student_id=student_id,
+                    classroom_id=classroom_id,
+                    month=month,
+                    present=present,
+                    total=total
+                ))
+                if len(batch) >= batch_size:
+                    AttendanceSummary.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            if batch:
+                AttendanceSummary.objects.bulk_create(batch)
+                created += len(batch)
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {created} attendance summary rows')
+        )
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+from dept.models import Announcement, AnnouncementRead, StudentProfile, UnreadAnnouncementCounter
+
+class Command(BaseCommand):
+    help = 'Recompute unread announcement counters and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted counters without fixing them')
+
+    def handle(self, *args, **options):
+        totals = dict(Announcement.objects.values('classroom_id').annotate(
+            n=Count('id')
+        ).values_list('classroom_id', 'n'))
+        
+        # Reads of announcements in the student's current classroom
+        reads = dict(AnnouncementRead.objects.filter(
+            announcement__classroom_id=F('student__classroom_id')
+        ).values('student_id').annotate(n=Count('id')).values_list('student_id', 'n'))
+        
+        current = {
+            (student_id, classroom_id): unread
+            for student_id, classroom_id, unread in UnreadAnnouncementCounter.objects.values_list(
+                'student_id', 'classroom_id', 'unread'
+            )
+        }
+        
+        counters = []
+        drifted = 0
+        for student_id, classroom_id in StudentProfile.objects.values_list('id', 'classroom_id'):
+            unread = max(totals.get(classroom_id, 0) - reads.get(student_id, 0), 0)
+            if current.get((student_id, classroom_id)) != unread:
+                drifted += 1
+                counters.append(UnreadAnnouncementCounter(
+                    student_id=student_id,
+                    classroom_id=classroom_id,
+                    unread=unread
+                ))
+        
+        # Counters left over from classrooms students have moved out of
+        stale = UnreadAnnouncementCounter.objects.exclude(
+            classroom_id=F('student__classroom_id')
+        )
+        
+        if options['dry_run']:
+            self.stdout.write(f'{drifted} counter(s) drifted, {stale.count()} stale')
+            return
+        
+        with transaction.atomic():
+            UnreadAnnouncementCounter.objects.bulk_create(
+                counters,
+                update_conflicts=True,
+                unique_fields=['student', 'classroom'],
+                update_fields=['unread'],
+                batch_size=1000
+            )
+            removed, _ = stale.delete()
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Repaired {drifted} counter(s), removed {removed} stale counter(s)')
+        )
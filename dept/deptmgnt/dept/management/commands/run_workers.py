@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def worker_loop(index, poll_interval, once, stop_event):
+    # Spawned workers start with a fresh interpreter
+    django.setup()
+    from dept.jobs import claim_job, run_job
+
+    # Let the parent decide when to stop; finish the current job first
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    worker_name = f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+    while not stop_event.is_set():
+        job = claim_job(worker_name)
+        if job is None:
+            if once:
+                break
+            stop_event.wait(poll_interval)
+            continue
+        run_job(job)
+
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers that poll the database job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Number of worker processes')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=3600,
+                            help='Requeue running jobs locked for longer than this many seconds')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is drained')
+
+    def handle(self, *args, **options):
+        from dept.jobs import requeue_stale_jobs
+
+        stale_after = options['stale_after']
+        requeued = requeue_stale_jobs(stale_after)
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale job(s)')
+
+        # Children must not inherit the parent's database connections
+        connections.close_all()
+
+        # Spawn rather than fork, so workers never share the parent's
+        # connections, threads or locks
+        context = multiprocessing.get_context('spawn')
+        stop_event = context.Event()
+        workers = [
+            context.Process(
+                target=worker_loop,
+                args=(i, options['poll_interval'], options['once'], stop_event),
+                name=f'dept-worker-{i}'
+            )
+            for i in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(self.style.SUCCESS(f'Started {len(workers)} worker(s)'))
+
+        def shutdown(signum, frame):
+            stop_event.set()
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        last_check = time.monotonic()
+        try:
+            while any(worker.is_alive() for worker in workers):
+                time.sleep(1)
+                if not stop_event.is_set() and time.monotonic() - last_check > 60:
+                    requeue_stale_jobs(stale_after)
+                    last_check = time.monotonic()
+        finally:
+            stop_event.set()
+            for worker in workers:
+                worker.join()
+
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
@@ -0,0 +1,230 @@
+from decimal import Decimal, InvalidOperation
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import F, FilteredRelation, Q
+
+from .models import Mark, StudentProfile
+from .stats import invalidate_marks_analytics
+
+MAX_MARKS_LIMIT = Decimal('999.99')
+MARK_KEY_FIELDS = ['student', 'classroom', 'subject', 'exam_type']
+
+
+def parse_decimal(value):
+    """Return ``value`` as a finite ``Decimal`` or ``None``."""
+    try:
+        number = Decimal(str(value).strip())
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return number if number.is_finite() else None
+
+
+def parse_mark_entries(entries):
+    """Parse ``"<student_id>:<marks>"`` strings posted by the marks pages.
+
+    Returns ``(pairs, invalid)`` where ``pairs`` is a list of
+    ``(student_id, marks)`` tuples and ``invalid`` lists the raw entries that
+    could not be parsed.
+    """
+    pairs = []
+    invalid = []
+    for entry in entries:
+        student_id, sep, marks = entry.partition(':')
+        marks = parse_decimal(marks)
+        if not sep or not student_id.strip().isdigit() or marks is None:
+            invalid.append(entry)
+            continue
+        pairs.append((int(student_id), marks))
+    return pairs, invalid
+
+
+def bulk_upsert_marks(classroom, subject, exam_type, entries, entered_by, maximum_marks=100):
+    """Write one gradebook column (a subject and exam for a classroom).
+
+    ``entries`` is an iterable of ``(student_id, marks)`` pairs. The roster is
+    validated with one query and every valid row is then written with a
+    single upsert on the ``(student, classroom, subject, exam_type)`` unique
+    key, so re-sending the same column is harmless.
+
+    Returns a dict mapping each submitted student id to one of ``'created'``,
+    ``'updated'``, ``'invalid_marks'`` or ``'not_in_class'``.
+    """
+    maximum_marks = parse_decimal(maximum_marks)
+    if maximum_marks is None or not 0 < maximum_marks <= MAX_MARKS_LIMIT:
+        raise ValueError('Maximum marks must be between 0 and 999.99')
+
+    submitted = {}
+    for student_id, marks in entries:
+        submitted[student_id] = marks
+
+    roster = set(StudentProfile.objects.filter(
+        id__in=submitted.keys(),
+        classroom=classroom,
+        is_approved=True
+    ).values_list('id', flat=True))
+
+    results = {}
+    rows = []
+    for student_id, marks in submitted.items():
+        if student_id not in roster:
+            results[student_id] = 'not_in_class'
+        elif not 0 <= marks <= maximum_marks:
+            results[student_id] = 'invalid_marks'
+        else:
+            rows.append(Mark(
+                student_id=student_id,
+                classroom=classroom,
+                subject=subject,
+                exam_type=exam_type,
+                marks_obtained=marks,
+                maximum_marks=maximum_marks,
+                entered_by=entered_by
+            ))
+
+    if not rows:
+        return results
+
+    with transaction.atomic():
+        existing = set(Mark.objects.filter(
+            classroom=classroom,
+            subject=subject,
+            exam_type=exam_type,
+            student_id__in=[row.student_id for row in rows]
+        ).values_list('student_id', flat=True))
+
+        Mark.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=MARK_KEY_FIELDS,
+            update_fields=['marks_obtained', 'maximum_marks']
+        )
+        invalidate_marks_analytics(classroom)
+
+    for row in rows:
+        results[row.student_id] = 'updated' if row.student_id in existing else 'created'
+
+    return results
+
+
+class Gradebook:
+    """A classroom's marks pivoted into students x ``(subject, exam_type)``.
+
+    ``columns`` is a sorted list of ``(subject, exam_type, maximum_marks)``
+    and every entry of ``rows`` is a ``(student, cells)`` pair where
+    ``cells`` lines up with ``columns`` and holds the marks obtained or
+    ``None``.
+    """
+    def __init__(self, classroom, students, marks):
+        self.classroom = classroom
+        maximum = {}
+        for (student_id, subject, exam_type), (obtained, maximum_marks) in marks.items():
+            maximum.setdefault((subject, exam_type), maximum_marks)
+        self.columns = [(subject, exam_type, maximum[subject, exam_type])
+                        for subject, exam_type in sorted(maximum)]
+        self.rows = [
+            (student, [
+                marks.get((student.id, subject, exam_type), (None, None))[0]
+                for subject, exam_type, maximum_marks in self.columns
+            ])
+            for student in students
+        ]
+
+
+def load_gradebook(classroom):
+    """Fetch the classroom's roster and all of its marks in one query and pivot them."""
+    queryset = StudentProfile.objects.filter(
+        classroom=classroom,
+        is_approved=True
+    ).annotate(
+        classroom_mark=FilteredRelation('mark', condition=Q(mark__classroom=classroom)),
+        gradebook_subject=F('classroom_mark__subject'),
+        gradebook_exam_type=F('classroom_mark__exam_type'),
+        gradebook_obtained=F('classroom_mark__marks_obtained'),
+        gradebook_maximum=F('classroom_mark__maximum_marks')
+    ).select_related('user').order_by('roll_no', 'id')
+
+    # The join repeats each student once per mark; keep the first copy
+    students = {}
+    marks = {}
+    for row in queryset:
+        students.setdefault(row.id, row)
+        if row.gradebook_subject is not None:
+            marks[row.id, row.gradebook_subject, row.gradebook_exam_type] = (
+                row.gradebook_obtained, row.gradebook_maximum
+            )
+    return Gradebook(classroom, list(students.values()), marks)
+
+
+def save_gradebook_changes(classroom, changes, entered_by):
+    """Apply the edited cells of a gradebook.
+
+    ``changes`` is an iterable of dicts with ``student_id``, ``subject``,
+    ``exam_type``, ``marks`` and ``maximum_marks``; a blank ``marks`` clears
+    the cell. Valid cells are written with one upsert and cleared cells
+    removed with one delete, inside a single transaction.
+
+    Returns ``(saved, cleared, errors)`` where ``errors`` lists the rejected
+    changes with an ``error`` message.
+    """
+    parsed = []
+    for change in changes:
+        student_id = str(change.get('student_id', '')).strip()
+        parsed.append((int(student_id) if student_id.isdigit() else None, change))
+
+    roster = set(StudentProfile.objects.filter(
+        id__in={student_id for student_id, change in parsed if student_id is not None},
+        classroom=classroom,
+        is_approved=True
+    ).values_list('id', flat=True))
+
+    rows = {}
+    cleared = {}
+    errors = []
+    for student_id, change in parsed:
+        subject = str(change.get('subject') or '').strip()
+        exam_type = str(change.get('exam_type') or '').strip()
+        key = (student_id, subject, exam_type)
+        if student_id not in roster:
+            errors.append(dict(change, error='Student is not in this classroom'))
+            continue
+        if not subject or not exam_type:
+            errors.append(dict(change, error='Subject and exam type are required'))
+            continue
+
+        if change.get('marks') in (None, ''):
+            rows.pop(key, None)
+            cleared[key] = Q(student_id=student_id, subject=subject, exam_type=exam_type)
+            continue
+        marks = parse_decimal(change['marks'])
+        maximum_marks = parse_decimal(change.get('maximum_marks', 100))
+        if maximum_marks is None or not 0 < maximum_marks <= MAX_MARKS_LIMIT:
+            errors.append(dict(change, error='Maximum marks must be between 0 and 999.99'))
+        elif marks is None or not 0 <= marks <= maximum_marks:
+            errors.append(dict(change, error='Marks must be between 0 and the maximum'))
+        else:
+            cleared.pop(key, None)
+            rows[key] = Mark(
+                student_id=student_id,
+                classroom=classroom,
+                subject=subject,
+                exam_type=exam_type,
+                marks_obtained=marks,
+                maximum_marks=maximum_marks,
+                entered_by=entered_by
+            )
+
+    with transaction.atomic():
+        if rows:
+            Mark.objects.bulk_create(
+                rows.values(),
+                update_conflicts=True,
+                unique_fields=MARK_KEY_FIELDS,
+                update_fields=['marks_obtained', 'maximum_marks']
+            )
+        if cleared:
+            Mark.objects.filter(classroom=classroom).filter(reduce(or_, cleared.values())).delete()
+        invalidate_marks_analytics(classroom)
+
+    return len(rows), len(cleared), errors
@@ -0,0 +1,81 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from .models import StaffProfile, StudentProfile
+
+SESSION_SAVED_AT_KEY = '_saved_at'
+
+
+def resolve_role(user):
+    """Return ``(role, profile)`` for ``user``.
+
+    ``role`` is ``'student'``, ``'staff'``, ``'hod'`` or ``None``. Students
+    take one query and staff two; ``user`` itself is the one already loaded
+    by the authentication middleware. The profiles looked up are cached on
+    ``user``, found or not, so later ``user.staffprofile`` or
+    ``hasattr(user, 'studentprofile')`` checks do not hit the database.
+    """
+    if not user.is_authenticated:
+        return None, None
+
+    lookups = (
+        ('studentprofile', StudentProfile.objects.select_related('department', 'classroom')),
+        ('staffprofile', StaffProfile.objects.select_related('department')),
+    )
+    for field, profiles in lookups:
+        relation = User._meta.get_field(field)
+        try:
+            profile = profiles.get(user_id=user.pk)
+        except profiles.model.DoesNotExist:
+            relation.set_cached_value(user, None)
+            continue
+        # Also points profile.user at this user
+        setattr(user, field, profile)
+        if field == 'studentprofile':
+            return 'student', profile
+        return ('hod' if profile.is_hod else 'staff'), profile
+    return None, None
+
+
+class RoleMiddleware:
+    """Attach ``request.role`` and ``request.profile`` once per request.
+
+    Must come after ``AuthenticationMiddleware``.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.role, request.profile = resolve_role(request.user)
+        return self.get_response(request)
+
+
+class SlidingSessionMiddleware:
+    """Keep sessions alive while in use without saving them on every request.
+
+    The session is saved when its data changes, or once more than
+    ``SESSION_REFRESH_AFTER`` (a fraction) of its expiry age has passed since
+    the last save; saving also renews the cookie. Read-only requests in
+    between write nothing. Must come after ``SessionMiddleware`` and is a
+    no-op while ``SESSION_SAVE_EVERY_REQUEST`` is on.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        session = getattr(request, 'session', None)
+        if session is None or settings.SESSION_SAVE_EVERY_REQUEST or session.is_empty():
+            return response
+
+        now = int(time.time())
+        if session.modified:
+            session[SESSION_SAVED_AT_KEY] = now
+        else:
+            refresh_after = session.get_expiry_age() * getattr(settings, 'SESSION_REFRESH_AFTER', 0.1)
+            if now - session.get(SESSION_SAVED_AT_KEY, 0) > refresh_after:
+                session[SESSION_SAVED_AT_KEY] = now
+        return response
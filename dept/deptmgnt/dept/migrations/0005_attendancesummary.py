@@ -0,0 +1,52 @@
+# Generated by Django 5.2.2 on 2026-10-18 03:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+
+
+def populate_summary(apps, schema_editor):
+    Attendance = apps.get_model('dept', 'Attendance')
+    AttendanceSummary = apps.get_model('dept', 'AttendanceSummary')
+    counts = Attendance.objects.annotate(
+        month=TruncMonth('date')
+    ).values('student_id', 'classroom_id', 'month').annotate(
+        total_days=Count('id'),
+        present_days=Count('id', filter=Q(status='P'))
+    ).order_by()
+    AttendanceSummary.objects.bulk_create([
+        AttendanceSummary(
+            student_id=row['student_id'],
+            classroom_id=row['classroom_id'],
+            month=row['month'],
+            present=row['present_days'],
+            total=row['total_days']
+        )
+        for row in counts
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dept', '0004_alter_attendance_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dept.classroom')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dept.studentprofile')),
+            ],
+            options={
+                'unique_together': {('student', 'classroom', 'month')},
+            },
+        ),
+        migrations.RunPython(populate_summary, migrations.RunPython.noop),
+    ]
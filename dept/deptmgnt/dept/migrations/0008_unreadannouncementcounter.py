@@ -0,0 +1,26 @@
+# Generated by Django 5.2.2 on 2026-10-18 03:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dept', '0007_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadAnnouncementCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unread', models.PositiveIntegerField(default=0)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dept.classroom')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dept.studentprofile')),
+            ],
+            options={
+                'unique_together': {('student', 'classroom')},
+            },
+        ),
+    ]
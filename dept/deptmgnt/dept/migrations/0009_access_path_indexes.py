@@ -0,0 +1,81 @@
+# Generated by Django 5.2.2 on 2026-10-18 03:13
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicate_marks(apps, schema_editor):
+    # Keep the most recently entered row of each (student, classroom, subject, exam_type)
+    Mark = apps.get_model('dept', 'Mark')
+    duplicates = Mark.objects.values(
+        'student_id', 'classroom_id', 'subject', 'exam_type'
+    ).annotate(keep_id=Max('id'), rows=Count('id')).filter(rows__gt=1).order_by()
+    for group in duplicates:
+        Mark.objects.filter(
+            student_id=group['student_id'],
+            classroom_id=group['classroom_id'],
+            subject=group['subject'],
+            exam_type=group['exam_type']
+        ).exclude(id=group['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dept', '0008_unreadannouncementcounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['classroom', '-created_at'], name='dept_ann_class_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['created_by', '-created_at'], name='dept_ann_staff_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['classroom', 'date'], name='dept_att_class_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'date', 'status'], name='dept_att_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(('status', 'P')), fields=['student', 'date'], name='dept_att_present_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecture',
+            index=models.Index(fields=['classroom', '-uploaded_at'], name='dept_lec_class_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecture',
+            index=models.Index(fields=['uploaded_by', '-uploaded_at'], name='dept_lec_staff_recent_idx'),
+        ),
+        # The unique key also serves the mark lookup
+        migrations.RunPython(remove_duplicate_marks, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='mark',
+            unique_together={('student', 'classroom', 'subject', 'exam_type')},
+        ),
+        migrations.AddIndex(
+            model_name='mark',
+            index=models.Index(fields=['student', 'classroom', '-entered_at'], name='dept_mark_student_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mark',
+            index=models.Index(fields=['entered_by', '-entered_at'], name='dept_mark_staff_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=models.Index(fields=['classroom', 'is_approved'], name='dept_student_class_appr_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=models.Index(condition=models.Q(('is_approved', False)), fields=['department'], name='dept_student_pending_idx'),
+        ),
+    ]
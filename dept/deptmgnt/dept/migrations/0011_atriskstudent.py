@@ -0,0 +1,31 @@
+# Generated by Django 5.2.2 on 2026-10-18 03:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dept', '0009_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AtRiskStudent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current_absence_run', models.PositiveIntegerField(default=0)),
+                ('longest_absence_run', models.PositiveIntegerField(default=0)),
+                ('recent_rate', models.FloatField(blank=True, null=True)),
+                ('previous_rate', models.FloatField(blank=True, null=True)),
+                ('reason', models.CharField(max_length=255)),
+                ('detected_on', models.DateField()),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dept.classroom')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dept.studentprofile')),
+            ],
+            options={
+                'unique_together': {('student', 'classroom')},
+            },
+        ),
+    ]
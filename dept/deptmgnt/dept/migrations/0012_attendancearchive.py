@@ -0,0 +1,49 @@
+# Generated by Django 5.2.2 on 2026-10-18 03:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dept', '0011_atriskstudent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=20)),
+                ('start_date', models.DateField()),
+                ('days', models.PositiveIntegerField()),
+                ('marked', models.BinaryField()),
+                ('present', models.BinaryField()),
+                ('present_count', models.PositiveIntegerField(default=0)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('compacted_at', models.DateTimeField(auto_now=True)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dept.classroom')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dept.studentprofile')),
+            ],
+            options={
+                'unique_together': {('student', 'classroom', 'academic_year')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceArchiveException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(max_length=1)),
+                ('updated_at', models.DateTimeField()),
+                ('archive', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='dept.attendancearchive')),
+                ('marked_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('archive', 'date')},
+            },
+        ),
+    ]
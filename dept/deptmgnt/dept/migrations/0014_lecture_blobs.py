@@ -0,0 +1,46 @@
+# Generated by Django 5.2.2 on 2026-10-18 03:28
+
+import os
+
+import dept.storage
+from django.db import migrations, models
+
+
+def fill_lecture_filenames(apps, schema_editor):
+    # Existing files are still named after their upload
+    Lecture = apps.get_model('dept', 'Lecture')
+    lectures = list(Lecture.objects.exclude(file='').only('id', 'file'))
+    for lecture in lectures:
+        lecture.filename = os.path.basename(lecture.file.name)
+    Lecture.objects.bulk_update(lectures, ['filename'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dept', '0013_lectureupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LectureBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('references', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='lecture',
+            name='filename',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='lecture',
+            name='file',
+            field=models.FileField(max_length=255, storage=dept.storage.ContentAddressedStorage(), upload_to='lectures/'),
+        ),
+        migrations.RunPython(fill_lecture_filenames, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-18 03:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dept', '0014_lecture_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='staffprofile',
+            name='thumbnail_of',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='thumbnail_of',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+    ]
@@ -1,7 +1,18 @@
+import os
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
+from django.utils import timezone
+from .images import thumbnail_name
+from .storage import lecture_storage
+
+# Bounds staleness when the cache backend is not shared between processes
+STAFF_CLASSES_CACHE_TIMEOUT = 300
 
 class Department(models.Model):
     name = models.CharField(max_length=100)
@@ -32,7 +43,64 @@ class ClassRoom(models.Model):
     def __str__(self):
         return f"{self.get_class_code_display()} ({self.academic_year})"
 
-class StudentProfile(models.Model):
+class StoredFieldsMixin:
+    """Remembers the stored values of ``stored_fields`` so receivers can tell what a save changed."""
+    stored_fields = ()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.stored_fields
+        }
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._stored_values = {name: getattr(self, name) for name in self.stored_fields}
+    
+    def stored_value(self, name):
+        """Value of ``name`` as last loaded or saved, ``None`` for a new instance."""
+        return getattr(self, '_stored_values', {}).get(name)
+    
+    def changed_fields(self):
+        """The ``stored_fields`` that differ from the stored row; all of them for a new instance."""
+        stored = getattr(self, '_stored_values', {})
+        return {name for name in self.stored_fields if name not in stored or stored[name] != getattr(self, name)}
+
+class ProfilePhotoMixin:
+    """Thumbnail URLs for a profile ``photo``, see ``dept.thumbnails``.
+
+    ``thumbnail_of`` names the photo the stored thumbnails were made from;
+    until it matches the current photo the URLs fall back to the photo.
+    """
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored photo so a new upload can be detected
+        if 'photo' in field_names:
+            instance._stored_photo = values[field_names.index('photo')]
+        return instance
+    
+    @property
+    def has_thumbnails(self):
+        return bool(self.photo) and self.thumbnail_of == self.photo.name
+    
+    @property
+    def thumbnail_url(self):
+        if not self.photo:
+            return None
+        if self.has_thumbnails:
+            return self.photo.storage.url(thumbnail_name(self.photo.name, 'jpg'))
+        return self.photo.url
+    
+    @property
+    def thumbnail_webp_url(self):
+        if self.has_thumbnails:
+            return self.photo.storage.url(thumbnail_name(self.photo.name, 'webp'))
+        return None
+
+class StudentProfile(ProfilePhotoMixin, StoredFieldsMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     roll_no = models.CharField(max_length=20, unique=True)
     department = models.ForeignKey(Department, on_delete=models.CASCADE)
@@ -40,14 +108,26 @@ class StudentProfile(models.Model):
     phone = models.CharField(max_length=15, blank=True)
     address = models.TextField(blank=True)
     photo = models.ImageField(upload_to='student_photos/', null=True, blank=True)
+    thumbnail_of = models.CharField(max_length=100, blank=True, editable=False)
     date_of_birth = models.DateField(null=True, blank=True)
     is_approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Fields the cached dashboard numbers depend on (see dept.stats)
+    stored_fields = ('department_id', 'classroom_id', 'is_approved')
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['classroom', 'is_approved'], name='dept_student_class_appr_idx'),
+            # Pending approvals are few, so index only those rows
+            models.Index(fields=['department'], condition=models.Q(is_approved=False),
+                         name='dept_student_pending_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.roll_no}"
 
-class StaffProfile(models.Model):
+class StaffProfile(ProfilePhotoMixin, StoredFieldsMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     staff_id = models.CharField(max_length=20, unique=True)
     department = models.ForeignKey(Department, on_delete=models.CASCADE)
@@ -56,12 +136,37 @@ class StaffProfile(models.Model):
     classes = models.ManyToManyField(ClassRoom, blank=True)
     is_hod = models.BooleanField(default=False)
     photo = models.ImageField(upload_to='staff_photos/', null=True, blank=True)
+    thumbnail_of = models.CharField(max_length=100, blank=True, editable=False)
     date_of_birth = models.DateField(null=True, blank=True)
     is_approved = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Fields the cached dashboard numbers depend on (see dept.stats)
+    stored_fields = ('department_id', 'is_approved')
+    
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.designation}"
+    
+    @staticmethod
+    def classes_cache_key(staff_id):
+        return f'dept:staff_classes:{staff_id}'
+    
+    def classroom_ids(self):
+        """IDs of the classrooms this staff member teaches, served from the cache."""
+        if not hasattr(self, '_classroom_ids'):
+            key = self.classes_cache_key(self.pk)
+            ids = cache.get(key)
+            if ids is None:
+                ids = frozenset(self.classes.values_list('id', flat=True))
+                cache.set(key, ids, STAFF_CLASSES_CACHE_TIMEOUT)
+            self._classroom_ids = ids
+        return self._classroom_ids
+    
+    def can_access(self, classroom_id):
+        try:
+            return int(classroom_id) in self.classroom_ids()
+        except (TypeError, ValueError):
+            return False
 
 # In dept/models.py
 from django.contrib.auth.models import User
@@ -82,6 +187,12 @@ class Attendance(models.Model):
     
     class Meta:
         unique_together = ['student', 'classroom', 'date']
+        indexes = [
+            models.Index(fields=['classroom', 'date'], name='dept_att_class_date_idx'),
+            models.Index(fields=['student', 'date', 'status'], name='dept_att_student_date_idx'),
+            models.Index(fields=['student', 'date'], condition=models.Q(status='P'),
+                         name='dept_att_present_idx'),
+        ]
     
     def __str__(self):
         return f"{self.student} - {self.date} - {self.get_status_display()}"
@@ -102,6 +213,13 @@ class Mark(models.Model):
     entered_by = models.ForeignKey(StaffProfile, on_delete=models.CASCADE)
     entered_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        unique_together = ['student', 'classroom', 'subject', 'exam_type']
+        indexes = [
+            models.Index(fields=['student', 'classroom', '-entered_at'], name='dept_mark_student_recent_idx'),
+            models.Index(fields=['entered_by', '-entered_at'], name='dept_mark_staff_recent_idx'),
+        ]
+    
     def percentage(self):
         return (self.marks_obtained / self.maximum_marks) * 100
     
@@ -117,6 +235,12 @@ class Announcement(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['classroom', '-created_at'], name='dept_ann_class_recent_idx'),
+            models.Index(fields=['created_by', '-created_at'], name='dept_ann_staff_recent_idx'),
+        ]
+    
     def __str__(self):
         return self.title
 
@@ -125,11 +249,236 @@ class Lecture(models.Model):
     description = models.TextField(blank=True)
     classroom = models.ForeignKey(ClassRoom, on_delete=models.CASCADE)
     uploaded_by = models.ForeignKey(StaffProfile, on_delete=models.CASCADE)
-    file = models.FileField(upload_to='lectures/')
+    # Stored once per distinct content, see dept.storage
+    file = models.FileField(upload_to='lectures/', storage=lecture_storage, max_length=255)
+    filename = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['classroom', '-uploaded_at'], name='dept_lec_class_recent_idx'),
+            models.Index(fields=['uploaded_by', '-uploaded_at'], name='dept_lec_staff_recent_idx'),
+        ]
+    
     def __str__(self):
         return self.title
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored blob so a replaced file can be released
+        if 'file' in field_names:
+            instance._stored_file = values[field_names.index('file')]
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # Blob names are digests, so keep the name the file was uploaded under
+        if self.file and not self.file._committed:
+            self.filename = os.path.basename(self.file.name)
+        super().save(*args, **kwargs)
+
+class LectureBlob(models.Model):
+    """A file in the lecture blob store and how many lectures refer to it.
+
+    ``references`` is kept in step by signals on ``Lecture``;
+    ``collect_lecture_blobs`` recounts it and removes unreferenced blobs.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    references = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.references} references)"
+    
+    @classmethod
+    def acquire(cls, name, size):
+        blob, created = cls.objects.get_or_create(name=name, defaults={'size': size, 'references': 1})
+        if not created:
+            cls.objects.filter(pk=blob.pk).update(references=models.F('references') + 1)
+    
+    @classmethod
+    def release(cls, name):
+        cls.objects.filter(name=name).update(references=Greatest(models.F('references') - 1, 0))
+
+class LectureUpload(models.Model):
+    """A lecture file being uploaded in chunks, see ``dept.uploads``.
+
+    The bytes received so far live in a temporary file; finishing the upload
+    moves that file into ``Lecture.file``.
+    """
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploaded_by = models.ForeignKey(StaffProfile, on_delete=models.CASCADE)
+    classroom = models.ForeignKey(ClassRoom, on_delete=models.CASCADE)
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading')
+    lecture = models.ForeignKey(Lecture, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+
+class AttendanceSummary(models.Model):
+    """Present/total day counts per student, classroom and month.
+
+    Rows are derived from ``Attendance`` and ``AttendanceArchive`` and
+    refreshed on every write; use the ``rebuild_attendance_summary`` command
+    to regenerate them from scratch.
+    """
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE)
+    classroom = models.ForeignKey(ClassRoom, on_delete=models.CASCADE)
+    month = models.DateField()  # First day of the month
+    present = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['student', 'classroom', 'month']
+    
+    def __str__(self):
+        return f"{self.student} - {self.month:%b %Y} - {self.present}/{self.total}"
+    
+    @staticmethod
+    def month_bounds(day):
+        month = day.replace(day=1)
+        if month.month == 12:
+            next_month = month.replace(year=month.year + 1, month=1)
+        else:
+            next_month = month.replace(month=month.month + 1)
+        return month, next_month
+    
+    @classmethod
+    def refresh(cls, classroom_id, day, student_ids):
+        """Recount the month containing ``day`` for the given students."""
+        month, next_month = cls.month_bounds(day)
+        live = Attendance.objects.filter(
+            classroom_id=classroom_id,
+            student_id__in=student_ids,
+            date__gte=month,
+            date__lt=next_month
+        )
+        counts = {
+            row['student_id']: (row['present_days'], row['total_days'])
+            for row in live.values('student_id').annotate(
+                total_days=models.Count('id'),
+                present_days=models.Count('id', filter=models.Q(status='P'))
+            )
+        }
+        
+        # Days compacted into an archive still count, unless a live row
+        # has since been written for the same date
+        archives = list(AttendanceArchive.objects.filter(
+            classroom_id=classroom_id,
+            student_id__in=student_ids,
+            start_date__lt=next_month
+        ))
+        if archives:
+            from .archive import archived_month_counts  # dept.archive imports this module
+            live_days = {}
+            for student_id, date in live.values_list('student_id', 'date'):
+                live_days.setdefault((student_id, classroom_id), set()).add(date)
+            archived = archived_month_counts(archives, live_days)
+            for student_id in student_ids:
+                present, total = archived.get((student_id, classroom_id, month), (0, 0))
+                if total:
+                    live_present, live_total = counts.get(student_id, (0, 0))
+                    counts[student_id] = (live_present + present, live_total + total)
+        
+        rows = [
+            cls(
+                student_id=student_id,
+                classroom_id=classroom_id,
+                month=month,
+                present=present,
+                total=total
+            )
+            for student_id, (present, total) in counts.items()
+        ]
+        if rows:
+            cls.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['student', 'classroom', 'month'],
+                update_fields=['present', 'total']
+            )
+        
+        # Students with no attendance left in this month lose their row
+        cls.objects.filter(
+            classroom_id=classroom_id,
+            month=month,
+            student_id__in=set(student_ids) - {row.student_id for row in rows}
+        ).delete()
+    
+    @classmethod
+    def totals(cls, **filters):
+        """Return ``(present, total)`` summed over the matching months."""
+        sums = cls.objects.filter(**filters).aggregate(
+            present_days=models.Sum('present'),
+            total_days=models.Sum('total')
+        )
+        return sums['present_days'] or 0, sums['total_days'] or 0
+
+class PerformanceReport(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    department = models.ForeignKey(Department, on_delete=models.CASCADE)
+    classroom = models.ForeignKey(ClassRoom, on_delete=models.CASCADE, null=True, blank=True)
+    requested_by = models.ForeignKey(StaffProfile, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file = models.FileField(upload_to='reports/', blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        scope = self.classroom.name if self.classroom else self.department.name
+        return f"Performance report - {scope} ({self.get_status_display()})"
+
+class Job(models.Model):
+    """A unit of background work picked up by the ``run_workers`` command."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    task = models.CharField(max_length=200)  # Dotted path to the task function
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    priority = models.IntegerField(default=0)  # Higher runs first
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_after'], name='dept_job_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.get_status_display()})"
 
 class AnnouncementRead(models.Model):
     announcement = models.ForeignKey(Announcement, on_delete=models.CASCADE)
@@ -139,6 +488,139 @@ class AnnouncementRead(models.Model):
     class Meta:
         unique_together = ['announcement', 'student']
 
+class UnreadAnnouncementCounter(models.Model):
+    """Denormalized count of unread announcements per student and classroom.
+
+    Seeded lazily by ``for_student``, incremented for the whole class when an
+    announcement is created, and decremented or recounted as read receipts
+    are written.
+    ``reconcile_unread_counters`` repairs any drift.
+    """
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE)
+    classroom = models.ForeignKey(ClassRoom, on_delete=models.CASCADE)
+    unread = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['student', 'classroom']
+    
+    def __str__(self):
+        return f"{self.student} - {self.classroom} - {self.unread} unread"
+    
+    @classmethod
+    def count_unread(cls, student, classroom):
+        return Announcement.objects.filter(classroom=classroom).exclude(
+            announcementread__student=student
+        ).count()
+    
+    @classmethod
+    def for_student(cls, student):
+        """Unread announcements in the student's classroom, seeding the counter if missing."""
+        counter = cls.objects.filter(student=student, classroom_id=student.classroom_id).first()
+        if counter is None:
+            counter, created = cls.objects.get_or_create(
+                student=student,
+                classroom_id=student.classroom_id,
+                defaults={'unread': cls.count_unread(student, student.classroom_id)}
+            )
+        return counter.unread
+    
+    @classmethod
+    def increment_classroom(cls, classroom_id):
+        """Add one unread announcement for every counted student in the classroom.
+
+        Students without a counter yet are seeded with an exact count on first read.
+        """
+        cls.objects.filter(classroom_id=classroom_id).update(unread=models.F('unread') + 1)
+    
+    @classmethod
+    def decrement(cls, classroom_id, student_ids, amount=1):
+        cls.objects.filter(
+            classroom_id=classroom_id,
+            student_id__in=student_ids
+        ).update(unread=Greatest(models.F('unread') - amount, 0))
+    
+    @classmethod
+    def recount(cls, student):
+        """Set the student's counter to the exact unread count in one UPDATE.
+
+        Safe under concurrent read receipts, unlike ``decrement``: the count
+        is taken by the statement that writes it.
+        """
+        unread = Announcement.objects.filter(
+            classroom_id=models.OuterRef('classroom_id')
+        ).exclude(models.Exists(AnnouncementRead.objects.filter(
+            announcement=models.OuterRef('pk'),
+            student_id=models.OuterRef(models.OuterRef('student_id'))
+        ))).order_by().values('classroom_id').annotate(n=models.Count('id')).values('n')
+        cls.objects.filter(
+            student=student,
+            classroom_id=student.classroom_id
+        ).update(unread=Coalesce(models.Subquery(unread), 0))
+
+class AttendanceArchive(models.Model):
+    """A student's attendance in a classroom for a closed academic year, packed into bitsets.
+
+    Bit ``i`` of ``marked`` (little-endian bit order) is set when attendance
+    was taken on ``start_date + i`` days, and the same bit of ``present`` when
+    the student was present. Written by ``compact_attendance``; read through
+    ``dept.archive``.
+    """
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE)
+    classroom = models.ForeignKey(ClassRoom, on_delete=models.CASCADE)
+    academic_year = models.CharField(max_length=20)
+    start_date = models.DateField()
+    days = models.PositiveIntegerField()
+    marked = models.BinaryField()
+    present = models.BinaryField()
+    present_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+    compacted_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['student', 'classroom', 'academic_year']
+    
+    def __str__(self):
+        return f"{self.student} - {self.classroom} - {self.academic_year}"
+
+class AttendanceArchiveException(models.Model):
+    """An archived day the bitsets cannot describe on their own.
+
+    Kept for statuses other than present/absent and for entries corrected
+    after the day they were taken, so the original audit details survive.
+    """
+    archive = models.ForeignKey(AttendanceArchive, on_delete=models.CASCADE, related_name='exceptions')
+    date = models.DateField()
+    status = models.CharField(max_length=1)
+    marked_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ['archive', 'date']
+    
+    def __str__(self):
+        return f"{self.archive} - {self.date} - {self.status}"
+
+class AtRiskStudent(models.Model):
+    """A student flagged by the nightly chronic-absence detector.
+
+    Rows are replaced classroom by classroom on each run, see
+    ``dept.absence.detect_chronic_absence``.
+    """
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE)
+    classroom = models.ForeignKey(ClassRoom, on_delete=models.CASCADE)
+    current_absence_run = models.PositiveIntegerField(default=0)
+    longest_absence_run = models.PositiveIntegerField(default=0)
+    recent_rate = models.FloatField(null=True, blank=True)
+    previous_rate = models.FloatField(null=True, blank=True)
+    reason = models.CharField(max_length=255)
+    detected_on = models.DateField()
+    
+    class Meta:
+        unique_together = ['student', 'classroom']
+    
+    def __str__(self):
+        return f"{self.student} - {self.classroom} - {self.reason}"
+
 # Signals to create profiles automatically
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -155,3 +637,82 @@ def save_user_profile(sender, instance, **kwargs):
     if hasattr(instance, 'staffprofile'):
         instance.staffprofile.save()
 
+def deleted_by_cascade(origin, model):
+    """Whether a delete signal of ``model`` comes from deleting some other model's rows.
+
+    Attendance is only cascaded from a student or classroom, which take
+    their summaries and cached totals with them, so the per-row upkeep
+    can be skipped.
+    """
+    if origin is None:
+        return False
+    origin_model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    return origin_model is not model
+
+# Keep the monthly attendance rollup in step with single-row writes.
+# Bulk writes refresh it themselves (see dept.attendance).
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def refresh_attendance_summary(sender, instance, origin=None, **kwargs):
+    if deleted_by_cascade(origin, Attendance):
+        return
+    day = Attendance._meta.get_field('date').to_python(instance.date)
+    AttendanceSummary.refresh(instance.classroom_id, day, [instance.student_id])
+
+# Drop cached classroom memberships whenever StaffProfile.classes changes,
+# from either side of the relation.
+@receiver(m2m_changed, sender=StaffProfile.classes.through)
+def invalidate_staff_classes(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+    if not reverse:
+        staff_ids = [instance.pk]
+    elif action == 'pre_clear':
+        staff_ids = list(instance.staffprofile_set.values_list('id', flat=True))
+    else:
+        staff_ids = pk_set or []
+    cache.delete_many([StaffProfile.classes_cache_key(staff_id) for staff_id in staff_ids])
+
+@receiver(pre_delete, sender=ClassRoom)
+def invalidate_classroom_staff(sender, instance, **kwargs):
+    staff_ids = instance.staffprofile_set.values_list('id', flat=True)
+    cache.delete_many([StaffProfile.classes_cache_key(staff_id) for staff_id in staff_ids])
+
+# Count the lectures sharing each blob
+@receiver(post_save, sender=Lecture)
+def count_lecture_blob(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_stored_file', None)
+    if instance.file.name == previous:
+        return
+    if instance.file:
+        LectureBlob.acquire(instance.file.name, instance.file.size)
+    if previous:
+        LectureBlob.release(previous)
+    instance._stored_file = instance.file.name
+
+@receiver(post_delete, sender=Lecture)
+def uncount_lecture_blob(sender, instance, **kwargs):
+    stored = getattr(instance, '_stored_file', instance.file.name)
+    if stored:
+        LectureBlob.release(stored)
+
+# Keep the unread announcement counters in step with announcements and reads.
+# Bulk read receipts decrement the counters themselves (see student_announcements).
+@receiver(post_save, sender=Announcement)
+def count_new_announcement(sender, instance, created, **kwargs):
+    if created:
+        UnreadAnnouncementCounter.increment_classroom(instance.classroom_id)
+
+@receiver(pre_delete, sender=Announcement)
+def uncount_deleted_announcement(sender, instance, **kwargs):
+    readers = AnnouncementRead.objects.filter(announcement=instance).values('student_id')
+    UnreadAnnouncementCounter.objects.filter(
+        classroom_id=instance.classroom_id
+    ).exclude(student_id__in=readers).update(
+        unread=Greatest(models.F('unread') - 1, 0)
+    )
+
+@receiver(post_save, sender=AnnouncementRead)
+def count_announcement_read(sender, instance, created, **kwargs):
+    if created:
+        UnreadAnnouncementCounter.decrement(instance.announcement.classroom_id, [instance.student_id])
@@ -0,0 +1,108 @@
+from django.core import signing
+from django.db.models import Q
+from django.http import JsonResponse
+
+CURSOR_SALT = 'dept.pagination'
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset, newest first."""
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.object_list = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def make_cursor(direction, obj, field):
+    value = getattr(obj, field)
+    return signing.dumps([direction, value.isoformat(), getattr(obj, 'pk', None)],
+                         salt=CURSOR_SALT, compress=True)
+
+
+def read_cursor(cursor, model, field):
+    """Return ``(direction, value, pk)`` or ``None`` for a missing or tampered cursor."""
+    if not cursor:
+        return None
+    try:
+        direction, value, pk = signing.loads(cursor, salt=CURSOR_SALT)
+        value = model._meta.get_field(field).to_python(value)
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+    if direction not in ('next', 'prev'):
+        return None
+    return direction, value, pk
+
+
+def page_size(per_page):
+    try:
+        return max(1, min(int(per_page), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+
+
+def paginate_keyset(queryset, field, cursor=None, per_page=DEFAULT_PAGE_SIZE):
+    """Page ``queryset`` by ``(-field, -id)`` using the position in ``cursor``.
+
+    Each page is a range scan from the cursor's key rather than an OFFSET,
+    so deep pages cost the same as the first one.
+    """
+    per_page = page_size(per_page)
+    position = read_cursor(cursor, queryset.model, field)
+
+    if position is None:
+        rows = list(queryset.order_by(f'-{field}', '-id')[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        has_newer = False
+    else:
+        direction, value, pk = position
+        if direction == 'next':
+            older = Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk})
+            rows = list(queryset.filter(older).order_by(f'-{field}', '-id')[:per_page + 1])
+            has_more = len(rows) > per_page
+            rows = rows[:per_page]
+            has_newer = True
+        else:
+            newer = Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk})
+            rows = list(queryset.filter(newer).order_by(field, 'id')[:per_page + 1])
+            has_newer = len(rows) > per_page
+            rows = rows[:per_page][::-1]
+            has_more = True
+
+    return KeysetPage(
+        rows,
+        next_cursor=make_cursor('next', rows[-1], field) if rows and has_more else None,
+        previous_cursor=make_cursor('prev', rows[0], field) if rows and has_newer else None
+    )
+
+
+def wants_json(request):
+    return request.GET.get('format') == 'json' or 'application/json' in request.headers.get('Accept', '')
+
+
+def keyset_json_response(page, serialize):
+    return JsonResponse({
+        'results': [serialize(obj) for obj in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
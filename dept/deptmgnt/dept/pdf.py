@@ -0,0 +1,50 @@
+# PDF rendering helpers for reports.
+#
+# This module must not import Django models: its functions run inside
+# worker processes that never set up Django.
+import io
+
+from pypdf import PdfWriter
+from reportlab.pdfgen import canvas
+
+ROWS_PER_PAGE = 32
+
+
+def paginate(rows, rows_per_page=ROWS_PER_PAGE):
+    return [rows[i:i + rows_per_page] for i in range(0, len(rows), rows_per_page)] or [[]]
+
+
+def render_pages(task):
+    """Render one chunk of report pages and return the PDF bytes.
+
+    ``task`` is a ``(header_lines, first_page_no, total_pages, pages)`` tuple
+    where ``pages`` is a list of pages, each a list of text lines.
+    """
+    header_lines, page_no, total_pages, pages = task
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer)
+
+    for lines in pages:
+        y_position = 800
+        for header in header_lines:
+            p.drawString(100, y_position, header)
+            y_position -= 20
+        for line in lines:
+            p.drawString(100, y_position, line)
+            y_position -= 20
+        p.drawString(100, 50, f"Page {page_no} of {total_pages}")
+        p.showPage()
+        page_no += 1
+
+    p.save()
+    return buffer.getvalue()
+
+
+def merge_pdfs(chunks):
+    """Concatenate rendered PDF chunks, in order, into a single document."""
+    writer = PdfWriter()
+    for chunk in chunks:
+        writer.append(io.BytesIO(chunk))
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Avg
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import StudentProfile
+from .pdf import merge_pdfs, paginate, render_pages
+
+
+def performance_rows(department, classroom=None):
+    """Return one formatted line per student, averages fetched in one grouped query."""
+    students = StudentProfile.objects.filter(
+        department=department,
+        is_approved=True
+    )
+    if classroom:
+        students = students.filter(classroom=classroom)
+    students = students.select_related('user').annotate(
+        avg_marks=Avg('mark__marks_obtained')
+    ).order_by('roll_no')
+
+    return [
+        f"{student.roll_no} - {student.user.get_full_name()}: {student.avg_marks or 0:.2f}%"
+        for student in students
+    ]
+
+
+def build_performance_report(report):
+    """Render ``report`` across a process pool and store the finished PDF.
+
+    Failures are recorded on the report and re-raised, so the job queue
+    retries them.
+    """
+    report.status = 'running'
+    report.save(update_fields=['status'])
+
+    try:
+        header_lines = [
+            f"Performance Report - {report.department.name}",
+            f"Generated on: {timezone.localtime().strftime('%Y-%m-%d %H:%M')}",
+        ]
+        if report.classroom:
+            header_lines.append(f"Class: {report.classroom.name}")
+
+        pages = paginate(performance_rows(report.department, report.classroom))
+        workers = getattr(settings, 'REPORT_WORKERS', None) or os.cpu_count() or 1
+        pages_per_chunk = max(1, -(-len(pages) // workers))
+        tasks = [
+            (header_lines, start + 1, len(pages), pages[start:start + pages_per_chunk])
+            for start in range(0, len(pages), pages_per_chunk)
+        ]
+
+        if len(tasks) == 1:
+            chunks = [render_pages(tasks[0])]
+        else:
+            # Workers only run reportlab, so spawn them rather than fork a
+            # process that holds database connections and threads.
+            with ProcessPoolExecutor(
+                max_workers=len(tasks),
+                mp_context=multiprocessing.get_context('spawn')
+            ) as pool:
+                chunks = list(pool.map(render_pages, tasks))
+
+        filename = f"performance_report_{report.id}_{timezone.now().strftime('%Y%m%d')}.pdf"
+        report.file.save(filename, ContentFile(merge_pdfs(chunks)), save=False)
+        report.status = 'done'
+        report.error = ''
+    except Exception as e:
+        report.status = 'failed'
+        report.error = str(e)
+        report.completed_at = timezone.now()
+        report.save()
+        raise
+
+    report.completed_at = timezone.now()
+    report.save()
+    return report
+
+
+def start_performance_report(report, created_by=None):
+    """Queue ``report`` for a background worker and return the Job."""
+    return enqueue('dept.tasks.generate_performance_report', created_by=created_by, report_id=report.id)
@@ -0,0 +1,129 @@
+from django.contrib.auth.models import User
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .analytics import marks_analytics
+from .cache import stats_cache
+from .models import Attendance, AttendanceSummary, ClassRoom, Mark, StaffProfile, StudentProfile, deleted_by_cascade
+
+
+def department_key(department_id):
+    return f'department:{department_id}'
+
+
+def student_key(student_id, classroom_id):
+    return f'student:{student_id}:{classroom_id}'
+
+
+def analytics_key(department_id, classroom_id=None):
+    return f'analytics:{department_id}:{classroom_id or "all"}'
+
+
+def department_stats(department_id):
+    """Head counts shown on the dashboards, shared by everyone in the department."""
+    def compute():
+        students = StudentProfile.objects.filter(department_id=department_id).aggregate(
+            total_students=Count('id', filter=Q(is_approved=True)),
+            pending_approvals=Count('id', filter=Q(is_approved=False))
+        )
+        staff = StaffProfile.objects.filter(department_id=department_id).aggregate(
+            total_staff=Count('id'),
+            approved_staff=Count('id', filter=Q(is_approved=True))
+        )
+        return dict(
+            students,
+            **staff,
+            total_classes=ClassRoom.objects.filter(department_id=department_id).count()
+        )
+    return stats_cache.get_or_set(department_key(department_id), compute)
+
+
+def student_attendance_totals(student_id, classroom_id):
+    """``(present, total)`` days of a student in a classroom."""
+    return stats_cache.get_or_set(
+        student_key(student_id, classroom_id),
+        lambda: AttendanceSummary.totals(student_id=student_id, classroom_id=classroom_id)
+    )
+
+
+def cached_marks_analytics(department, classroom=None):
+    """``marks_analytics`` for a department or one of its classrooms, cached."""
+    return stats_cache.get_or_set(
+        analytics_key(department.id, classroom.id if classroom else None),
+        lambda: marks_analytics(department, classroom)
+    )
+
+
+def invalidate_marks_analytics(classroom):
+    """Drop the analytics that include marks of ``classroom``."""
+    stats_cache.invalidate(
+        analytics_key(classroom.department_id),
+        analytics_key(classroom.department_id, classroom.id)
+    )
+
+
+# Drop cached numbers when the rows behind them change. Bulk attendance
+# and mark writes skip these signals and invalidate themselves (see
+# dept.attendance and dept.marks).
+@receiver(post_delete, sender=StudentProfile)
+@receiver(post_delete, sender=StaffProfile)
+@receiver(post_save, sender=ClassRoom)
+@receiver(post_delete, sender=ClassRoom)
+def invalidate_department_stats(sender, instance, **kwargs):
+    stats_cache.invalidate(department_key(instance.department_id))
+
+
+# Profiles are re-saved on every User save, logins included, so only
+# saves that change what the numbers count invalidate them
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_save, sender=StaffProfile)
+def invalidate_changed_profile_stats(sender, instance, **kwargs):
+    changed = instance.changed_fields()
+    if not changed:
+        return
+    departments = {instance.department_id, instance.stored_value('department_id')} - {None}
+    keys = [department_key(department_id) for department_id in departments]
+    if sender is StudentProfile:
+        classrooms = {instance.classroom_id, instance.stored_value('classroom_id')} - {None}
+        keys += [analytics_key(department_id) for department_id in departments]
+        keys += [
+            analytics_key(department_id, classroom_id)
+            for department_id in departments for classroom_id in classrooms
+        ]
+    stats_cache.invalidate(*keys)
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def invalidate_attendance_stats(sender, instance, origin=None, **kwargs):
+    if deleted_by_cascade(origin, Attendance):
+        return
+    stats_cache.invalidate(student_key(instance.student_id, instance.classroom_id))
+
+
+@receiver(post_save, sender=Mark)
+@receiver(post_delete, sender=Mark)
+def invalidate_mark_analytics(sender, instance, **kwargs):
+    invalidate_marks_analytics(instance.classroom)
+
+
+# Approval and names feed the rankings too
+@receiver(post_delete, sender=StudentProfile)
+def invalidate_student_analytics(sender, instance, **kwargs):
+    stats_cache.invalidate(
+        analytics_key(instance.department_id),
+        analytics_key(instance.department_id, instance.classroom_id)
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_renamed_student_analytics(sender, instance, created, update_fields=None, **kwargs):
+    # Logins only save last_login
+    if created or (update_fields is not None and not {'first_name', 'last_name'} & set(update_fields)):
+        return
+    try:
+        student = instance.studentprofile
+    except StudentProfile.DoesNotExist:
+        return
+    invalidate_student_analytics(StudentProfile, student)
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Blobs live under MEDIA_ROOT/lectures/blobs/<first two hex digits>/
+BLOB_DIR = 'lectures/blobs'
+HASH_BUFFER_SIZE = 64 * 1024
+
+
+def blob_name(digest):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Stores each distinct file once, named by the SHA-256 of its content.
+
+    Saving content that is already stored writes nothing and returns the
+    existing name, so lectures uploaded to several classrooms share one
+    blob, whatever name or extension it was uploaded under. Keep the
+    original name elsewhere (``Lecture.filename``).
+
+    Blobs can be shared, so ``delete`` leaves them in place.
+    ``collect_lecture_blobs`` removes the ones no lecture refers to.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save
+        return name
+
+    def _save(self, name, content):
+        if hasattr(content, 'temporary_file_path'):
+            # Already on disk: hash it, then move it into place
+            source = content.temporary_file_path()
+            digest = hashlib.sha256()
+            with open(source, 'rb') as f:
+                for data in iter(lambda: f.read(HASH_BUFFER_SIZE), b''):
+                    digest.update(data)
+            name = blob_name(digest.hexdigest())
+            if self.exists(name):
+                self._touch(name)
+            else:
+                os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+                file_move_safe(source, self.path(name), allow_overwrite=True)
+                self._set_permissions(name)
+            return name
+
+        # Hash while copying into a temporary file beside the blobs
+        blob_root = self.path(BLOB_DIR)
+        os.makedirs(blob_root, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=blob_root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+            name = blob_name(digest.hexdigest())
+            if self.exists(name):
+                os.remove(temp_path)
+                self._touch(name)
+            else:
+                os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+                os.replace(temp_path, self.path(name))
+                self._set_permissions(name)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+    def _touch(self, name):
+        # A reused blob counts as new, so collection leaves it alone
+        # until the lecture referring to it has been saved
+        os.utime(self.path(name))
+
+    def _set_permissions(self, name):
+        if self.file_permissions_mode is not None:
+            os.chmod(self.path(name), self.file_permissions_mode)
+
+    def delete(self, name):
+        pass
+
+    def purge(self, name):
+        """Remove a blob for good; only for blobs nothing refers to."""
+        super().delete(name)
+
+    def blob_names(self):
+        """Every stored blob name."""
+        if not self.exists(BLOB_DIR):
+            return
+        for prefix in self.listdir(BLOB_DIR)[0]:
+            for filename in self.listdir(f'{BLOB_DIR}/{prefix}')[1]:
+                yield f'{BLOB_DIR}/{prefix}/{filename}'
+
+
+lecture_storage = ContentAddressedStorage()
@@ -0,0 +1,19 @@
+# Background tasks run by the job queue (see dept.jobs and run_workers).
+# Each task takes JSON-serialisable keyword arguments and may return a
+# JSON-serialisable result that is stored on the Job.
+from .models import PerformanceReport
+from .reports import build_performance_report
+from .thumbnails import PROFILE_MODELS, build_thumbnails
+
+
+def generate_performance_report(report_id):
+    report = PerformanceReport.objects.select_related('department', 'classroom').get(id=report_id)
+    build_performance_report(report)
+    return {'status': report.status, 'file': report.file.name}
+
+
+def generate_photo_thumbnails(kind, profile_id):
+    profile = PROFILE_MODELS[kind].objects.filter(id=profile_id).first()
+    if profile is None or not profile.photo:
+        return {'status': 'skipped'}
+    return {'status': 'done', 'photo': build_thumbnails(profile)}
@@ -0,0 +1,14 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def cursor_query(context, cursor):
+    """The current query string with only ``cursor`` replaced, e.g. ``?cursor=...&per_page=50``.
+
+    Keeps ``per_page`` and any filters when moving between pages.
+    """
+    query = context['request'].GET.copy()
+    query['cursor'] = cursor
+    return '?' + query.urlencode()
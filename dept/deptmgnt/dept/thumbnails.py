@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .images import make_thumbnails
+from .jobs import enqueue
+from .models import StaffProfile, StudentProfile
+
+# Keys used in job payloads
+PROFILE_MODELS = {
+    'student': StudentProfile,
+    'staff': StaffProfile,
+}
+
+
+def profile_kind(profile):
+    return 'student' if isinstance(profile, StudentProfile) else 'staff'
+
+
+def queue_thumbnails(profile):
+    """Have a background worker make thumbnails of ``profile``'s photo."""
+    return enqueue('dept.tasks.generate_photo_thumbnails', priority=-1,
+                   kind=profile_kind(profile), profile_id=profile.pk)
+
+
+def mark_thumbnails_ready(model, profile_id, name):
+    # Only if the photo was not replaced while the thumbnails were made
+    return model.objects.filter(pk=profile_id, photo=name).update(thumbnail_of=name)
+
+
+def build_thumbnails(profile):
+    """Make the thumbnails of ``profile``'s photo now and record them."""
+    name = profile.photo.name
+    make_thumbnails(profile.photo.path, mode=settings.FILE_UPLOAD_PERMISSIONS)
+    if mark_thumbnails_ready(type(profile), profile.pk, name):
+        profile.thumbnail_of = name
+    return name
+
+
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_save, sender=StaffProfile)
+def queue_new_photo_thumbnails(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_stored_photo', None)
+    if instance.photo and instance.photo.name != previous and not instance.has_thumbnails:
+        queue_thumbnails(instance)
+    instance._stored_photo = instance.photo.name
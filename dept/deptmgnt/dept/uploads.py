@@ -0,0 +1,125 @@
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Lecture, LectureUpload
+
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class UploadOffsetError(Exception):
+    """A chunk does not continue the bytes received so far."""
+    def __init__(self, expected):
+        super().__init__(f'Expected a chunk at offset {expected}')
+        self.expected = expected
+
+
+class AssembledFile(File):
+    """The finished temporary file.
+
+    ``temporary_file_path`` lets the lecture storage hash the file and move
+    it into place instead of copying it; other storages read it in chunks.
+    """
+    def __init__(self, path, name):
+        super().__init__(open(path, 'rb'), name)
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def part_path(upload):
+    return Path(settings.LECTURE_UPLOAD_DIR) / f'{upload.id}.part'
+
+
+def start_upload(upload):
+    """Save a new ``LectureUpload`` and create its empty temporary file."""
+    upload.save()
+    os.makedirs(settings.LECTURE_UPLOAD_DIR, exist_ok=True)
+    open(part_path(upload), 'wb').close()
+    return upload
+
+
+def write_chunk(upload, offset, stream, length):
+    """Copy ``length`` bytes from ``stream`` into the upload at ``offset``.
+
+    The chunk must start at or before the end of what was already received,
+    so a client can resend a chunk whose response it never saw. Bytes are
+    copied through a small buffer and never held in memory as a whole.
+    Returns the number of bytes received so far.
+    """
+    if offset > upload.received:
+        raise UploadOffsetError(upload.received)
+    if offset + length > upload.size:
+        raise ValueError('Chunk runs past the declared file size')
+
+    written = 0
+    with open(part_path(upload), 'r+b') as part:
+        part.seek(offset)
+        while written < length:
+            data = stream.read(min(COPY_BUFFER_SIZE, length - written))
+            if not data:
+                break  # Client went away; keep what arrived
+            part.write(data)
+            written += len(data)
+
+    end = offset + written
+    LectureUpload.objects.filter(pk=upload.pk, received__lt=end).update(
+        received=end,
+        updated_at=timezone.now()
+    )
+    upload.received = max(upload.received, end)
+    return upload.received
+
+
+def finish_upload(upload):
+    """Turn a fully received upload into a ``Lecture`` and return it.
+
+    Calling it again for a completed upload, concurrently or not, returns
+    the same lecture.
+    """
+    with transaction.atomic():
+        # Concurrent finishes take turns on the upload row; the later one
+        # sees it complete and never touches the moved part file
+        upload = LectureUpload.objects.select_for_update().select_related('lecture').get(pk=upload.pk)
+        if upload.status == 'complete':
+            if upload.lecture is None:
+                raise ValueError('The lecture made from this upload has been deleted')
+            return upload.lecture
+        if upload.received != upload.size:
+            raise ValueError(f'Only {upload.received} of {upload.size} bytes have been received')
+
+        content = AssembledFile(part_path(upload), upload.filename)
+        try:
+            lecture = Lecture(
+                title=upload.title,
+                description=upload.description,
+                classroom=upload.classroom,
+                uploaded_by=upload.uploaded_by,
+                filename=upload.filename
+            )
+            lecture.file.save(upload.filename, content, save=False)
+            lecture.save()
+            upload.status = 'complete'
+            upload.lecture = lecture
+            upload.save(update_fields=['status', 'lecture', 'updated_at'])
+        finally:
+            content.close()
+    discard_part(upload)
+    return lecture
+
+
+def discard_part(upload):
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def abort_upload(upload):
+    discard_part(upload)
+    upload.delete()
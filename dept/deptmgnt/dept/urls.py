@@ -20,23 +20,35 @@ urlpatterns = [
     path('student/attendance/', views.student_attendance, name='student_attendance'),
     path('student/marks/', views.student_marks, name='student_marks'),
     path('student/announcements/', views.student_announcements, name='student_announcements'),
+    path('student/announcements/stream/', views.student_announcement_stream, name='student_announcement_stream'),
     path('student/lectures/', views.student_lectures, name='student_lectures'),
+    path('lectures/<int:lecture_id>/download/', views.lecture_download, name='lecture_download'),
+    path('lectures/classroom/<int:classroom_id>/download/', views.lecture_bundle, name='lecture_bundle'),
     
     # Staff views
     path('staff/students/', views.staff_students, name='staff_students'),
     path('staff/attendance/', views.staff_attendance, name='staff_attendance'),
     path('staff/marks/', views.staff_marks, name='staff_marks'),
+    path('staff/gradebook/', views.staff_gradebook, name='staff_gradebook'),
     path('staff/announcements/', views.staff_announcements, name='staff_announcements'),
     path('staff/lectures/', views.staff_lectures, name='staff_lectures'),
     
     # HOD views
     path('hod/dashboard/', views.hod_dashboard, name='hod_dashboard'),
     path('hod/reports/', views.hod_reports, name='hod_reports'),
+    path('hod/reports/<int:report_id>/download/', views.download_report, name='download_report'),
     
     # API endpoints
     path('api/mark_attendance/', views.mark_attendance, name='mark_attendance'),
     path('api/enter_marks/', views.enter_marks, name='enter_marks'),
+    path('api/enter_marks/bulk/', views.enter_marks_bulk, name='enter_marks_bulk'),
+    path('api/gradebook/save/', views.save_gradebook, name='save_gradebook'),
     path('api/approve_student/<int:student_id>/', views.approve_student, name='approve_student'),
+    path('api/jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('api/lectures/uploads/', views.lecture_upload_start, name='lecture_upload_start'),
+    path('api/lectures/uploads/<uuid:upload_id>/', views.lecture_upload_chunk, name='lecture_upload_chunk'),
+    path('api/lectures/uploads/<uuid:upload_id>/finish/', views.lecture_upload_finish, name='lecture_upload_finish'),
+    path('api/analytics/marks/', views.marks_analytics_api, name='marks_analytics_api'),
 
     path('api/get-classrooms/', views.get_classrooms, name='get_classrooms'),
 
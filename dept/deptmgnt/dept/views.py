@@ -1,13 +1,27 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate
-from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
-from django.db.models import Count, Avg, Q
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse, Http404
+from django.urls import reverse
+from django.db.models import Count, Avg, Q, Exists, OuterRef
 from .models import *
 from .forms import *
-from reportlab.pdfgen import canvas
+from .archive import archived_totals, attendance_page, live_attendance_days
+from .bundles import stream_zip
+from .decorators import role_required
+from .downloads import serve_file
+from .jobs import get_job
+from .live import announcement_batch, announcement_events
+from .marks import bulk_upsert_marks, load_gradebook, parse_mark_entries, save_gradebook_changes
+from .pagination import DEFAULT_PAGE_SIZE, paginate_keyset, wants_json, keyset_json_response
+from .reports import start_performance_report
+from .stats import cached_marks_analytics, department_stats, student_attendance_totals
+from .uploads import UploadOffsetError, abort_upload, finish_upload, start_upload, write_chunk
 import csv
+import json
+import os
+from django.conf import settings
 from datetime import datetime, date
 
 def home(request):
@@ -68,8 +82,8 @@ def staff_register(request):
 def dashboard(request):
     context = {}
     
-    if hasattr(request.user, 'studentprofile'):
-        student = request.user.studentprofile
+    if request.role == 'student':
+        student = request.profile
         context['role'] = 'student'
         context['student'] = student
         
@@ -79,37 +93,22 @@ def dashboard(request):
         ).order_by('-created_at')[:5]
         
         # Get attendance summary
-        total_days = Attendance.objects.filter(
-            student=student, 
-            classroom=student.classroom
-        ).count()
-        present_days = Attendance.objects.filter(
-            student=student, 
-            classroom=student.classroom,
-            status='P'
-        ).count()
+        present_days, total_days = student_attendance_totals(student.id, student.classroom_id)
         context['attendance_percentage'] = (present_days / total_days * 100) if total_days > 0 else 0
+        context['unread_announcements'] = UnreadAnnouncementCounter.for_student(student)
         
-    elif hasattr(request.user, 'staffprofile'):
-        staff = request.user.staffprofile
+    elif request.role in ('staff', 'hod'):
+        staff = request.profile
         context['role'] = 'staff'
         context['staff'] = staff
         
         if staff.is_hod:
             context['role'] = 'hod'
             # HOD specific data
-            department = staff.department
-            context['total_students'] = StudentProfile.objects.filter(
-                department=department, 
-                is_approved=True
-            ).count()
-            context['total_staff'] = StaffProfile.objects.filter(
-                department=department,
-                is_approved=True
-            ).count()
-            context['total_classes'] = ClassRoom.objects.filter(
-                department=department
-            ).count()
+            stats = department_stats(staff.department_id)
+            context['total_students'] = stats['total_students']
+            context['total_staff'] = stats['approved_staff']
+            context['total_classes'] = stats['total_classes']
         
         # Get staff's classes
         context['classes'] = staff.classes.all()
@@ -119,86 +118,252 @@ def dashboard(request):
     
     return render(request, 'dashboard.html', context)
 
+# JSON representations for the paginated listing views (?format=json)
+def attendance_json(attendance):
+    return {
+        'id': attendance.id,
+        'date': attendance.date.isoformat(),
+        'status': attendance.status,
+    }
+
+def mark_json(mark):
+    return {
+        'id': mark.id,
+        'student_id': mark.student_id,
+        'classroom_id': mark.classroom_id,
+        'subject': mark.subject,
+        'exam_type': mark.exam_type,
+        'marks_obtained': str(mark.marks_obtained),
+        'maximum_marks': str(mark.maximum_marks),
+        'entered_at': mark.entered_at.isoformat(),
+    }
+
+def announcement_json(announcement):
+    return {
+        'id': announcement.id,
+        'classroom_id': announcement.classroom_id,
+        'title': announcement.title,
+        'content': announcement.content,
+        'important': announcement.important,
+        'created_at': announcement.created_at.isoformat(),
+    }
+
+def lecture_json(lecture):
+    return {
+        'id': lecture.id,
+        'classroom_id': lecture.classroom_id,
+        'title': lecture.title,
+        'description': lecture.description,
+        'filename': lecture.filename,
+        'file': reverse('lecture_download', args=[lecture.id]) if lecture.file else None,
+        'uploaded_at': lecture.uploaded_at.isoformat(),
+    }
+
 # Student Views
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'studentprofile'))
+@role_required('student')
 def student_attendance(request):
-    student = request.user.studentprofile
+    student = request.profile
     
     # Calculate attendance percentage
-    total_days = Attendance.objects.filter(
-        student=student, 
-        classroom=student.classroom
-    ).count()
-    present_days = Attendance.objects.filter(
-        student=student, 
-        classroom=student.classroom,
-        status='P'
-    ).count()
+    present_days, total_days = student_attendance_totals(student.id, student.classroom_id)
     
     attendance_percentage = (present_days / total_days * 100) if total_days > 0 else 0
     
-    attendances = Attendance.objects.filter(
-        student=student, 
-        classroom=student.classroom
-    ).order_by('-date')
+    # Compacted years are merged in from their archives
+    attendances = attendance_page(
+        student, student.classroom,
+        request.GET.get('cursor'), request.GET.get('per_page', DEFAULT_PAGE_SIZE)
+    )
+    if attendances is None:
+        attendances = paginate_keyset(
+            Attendance.objects.filter(student=student, classroom=student.classroom),
+            'date', request.GET.get('cursor'), request.GET.get('per_page', DEFAULT_PAGE_SIZE)
+        )
+    if wants_json(request):
+        return keyset_json_response(attendances, attendance_json)
     
     return render(request, 'student/attendance.html', {
         'attendances': attendances,
+        'page': attendances,
         'student': student,
         'attendance_percentage': attendance_percentage
     })
 
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'studentprofile'))
+@role_required('student')
 def student_marks(request):
-    student = request.user.studentprofile
-    marks = Mark.objects.filter(
-        student=student, 
-        classroom=student.classroom
-    ).order_by('-entered_at')
+    student = request.profile
+    marks = paginate_keyset(
+        Mark.objects.filter(
+            student=student, 
+            classroom=student.classroom
+        ).select_related('entered_by__user'),
+        'entered_at', request.GET.get('cursor'), request.GET.get('per_page', DEFAULT_PAGE_SIZE)
+    )
+    if wants_json(request):
+        return keyset_json_response(marks, mark_json)
     
     return render(request, 'student/marks.html', {
         'marks': marks,
+        'page': marks,
         'student': student
     })
 
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'studentprofile'))
+@role_required('student')
 def student_announcements(request):
-    student = request.user.studentprofile
+    student = request.profile
     announcements = Announcement.objects.filter(
         classroom=student.classroom
-    ).order_by('-created_at')
-    
-    # Mark as read when viewed
-    for announcement in announcements:
-        AnnouncementRead.objects.get_or_create(
-            announcement=announcement,
+    ).select_related('created_by__user').annotate(
+        was_read=Exists(AnnouncementRead.objects.filter(
+            announcement=OuterRef('pk'),
             student=student
-        )
+        ))
+    )
+    page = paginate_keyset(
+        announcements, 'created_at',
+        request.GET.get('cursor'), request.GET.get('per_page', DEFAULT_PAGE_SIZE)
+    )
+    
+    # Mark only the unread announcements on this page as read. With
+    # ignore_conflicts bulk_create cannot say which rows a concurrent load
+    # already inserted, so recount rather than decrement.
+    new_reads = AnnouncementRead.objects.bulk_create([
+        AnnouncementRead(announcement=announcement, student=student)
+        for announcement in page
+        if not announcement.was_read
+    ], ignore_conflicts=True)
+    if new_reads:
+        UnreadAnnouncementCounter.recount(student)
+    
+    if wants_json(request):
+        return keyset_json_response(page, announcement_json)
     
     return render(request, 'student/announcements.html', {
-        'announcements': announcements
+        'announcements': page,
+        'page': page,
+        'student': student,
+        'announcement_streaming': settings.ANNOUNCEMENT_STREAMING
     })
 
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'studentprofile'))
+@role_required('student')
 def student_lectures(request):
-    student = request.user.studentprofile
-    lectures = Lecture.objects.filter(
-        classroom=student.classroom
-    ).order_by('-uploaded_at')
+    student = request.profile
+    lectures = paginate_keyset(
+        Lecture.objects.filter(
+            classroom=student.classroom
+        ).select_related('uploaded_by__user'),
+        'uploaded_at', request.GET.get('cursor'), request.GET.get('per_page', DEFAULT_PAGE_SIZE)
+    )
+    if wants_json(request):
+        return keyset_json_response(lectures, lecture_json)
     
     return render(request, 'student/lectures.html', {
-        'lectures': lectures
+        'lectures': lectures,
+        'page': lectures,
+        'student': student
     })
 
+def can_view_lectures(request, classroom):
+    """Whether the user may download the lectures of ``classroom``."""
+    profile = request.profile
+    if request.role == 'student':
+        return profile.is_approved and profile.classroom_id == classroom.id
+    if request.role in ('staff', 'hod'):
+        return profile.can_access(classroom.id) or (
+            profile.is_hod and classroom.department_id == profile.department_id
+        )
+    return False
+
+@login_required
+def lecture_download(request, lecture_id):
+    """Serve a lecture file to the students and staff of its classroom.
+
+    Supports ``Range`` requests for seeking in videos; ``?download=1`` asks
+    the browser to save the file rather than open it.
+    """
+    lecture = get_object_or_404(Lecture.objects.select_related('classroom'), id=lecture_id)
+    if not can_view_lectures(request, lecture.classroom) or not lecture.file:
+        raise Http404('Lecture not found')
+    
+    try:
+        return serve_file(request, lecture.file.storage, lecture.file.name,
+                          lecture.filename or os.path.basename(lecture.file.name),
+                          as_attachment=request.GET.get('download') == '1')
+    except FileNotFoundError:
+        raise Http404('Lecture file is missing')
+
+@login_required
+def lecture_bundle(request, classroom_id):
+    """Stream every lecture file of a classroom as one ZIP archive.
+
+    ``?from=`` and ``?to=`` (``YYYY-MM-DD``) limit it to lectures uploaded
+    in that date range.
+    """
+    classroom = get_object_or_404(ClassRoom, id=classroom_id)
+    if not can_view_lectures(request, classroom):
+        raise Http404('Classroom not found')
+    
+    lectures = Lecture.objects.filter(classroom=classroom).exclude(file='')
+    date_from = parse_date(request.GET.get('from', ''))
+    date_to = parse_date(request.GET.get('to', ''))
+    if date_from:
+        lectures = lectures.filter(uploaded_at__date__gte=date_from)
+    if date_to:
+        lectures = lectures.filter(uploaded_at__date__lte=date_to)
+    
+    # Stat every file up front so missing files are skipped, not fatal mid-stream
+    files = []
+    for lecture in lectures.order_by('uploaded_at').only('file', 'filename', 'title', 'uploaded_at'):
+        path = lecture.file.path
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        name = (lecture.filename or os.path.basename(lecture.file.name)).replace('/', '_').replace('\\', '_')
+        files.append((f"{lecture.uploaded_at:%Y-%m-%d} {name}", path, stat.st_size, stat.st_mtime))
+    if not files:
+        raise Http404('No lecture files to download')
+    
+    response = StreamingHttpResponse(stream_zip(files), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{classroom.class_code} lectures.zip"'
+    return response
+
+@login_required
+@role_required('student')
+async def student_announcement_stream(request):
+    """Server-Sent Events feed of new announcements for the student's class.
+
+    Streams only with ``ANNOUNCEMENT_STREAMING``, which needs an ASGI server
+    (deptmgnt.asgi). Otherwise it answers with what was missed and closes,
+    and the browser reconnects after the ``retry:`` delay.
+    """
+    last_event_id = request.headers.get('Last-Event-ID')
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    if not settings.ANNOUNCEMENT_STREAMING:
+        response = HttpResponse(
+            await announcement_batch(request.profile.classroom_id, last_event_id),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        return response
+    
+    response = StreamingHttpResponse(
+        announcement_events(request.profile.classroom_id, last_event_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 # Staff Views
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'staffprofile'))
+@role_required('staff')
 def staff_students(request):
-    staff = request.user.staffprofile
+    staff = request.profile
     classroom_id = request.GET.get('classroom')
     
     if classroom_id:
@@ -218,44 +383,35 @@ def staff_students(request):
     })
 
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'staffprofile'))
+@role_required('staff')
 def staff_attendance(request):
-    staff = request.user.staffprofile
+    staff = request.profile
     classroom_id = request.GET.get('classroom')
     selected_date = request.GET.get('date', date.today().isoformat())
     
     if classroom_id:
         classroom = get_object_or_404(ClassRoom, id=classroom_id)
-        students = StudentProfile.objects.filter(
-            classroom=classroom, 
-            is_approved=True
-        )
         
-        # Get existing attendance for the date
-        attendance_data = {}
-        for student in students:
-            attendance = Attendance.objects.filter(
-                student=student,
-                date=selected_date
-            ).first()
-            attendance_data[student.id] = attendance.status if attendance else None
+        # Students with their existing attendance for the date, in one query
+        students = roster_with_attendance(
+            classroom,
+            parse_date(selected_date) or date.today()
+        )
     else:
         classroom = None
         students = []
-        attendance_data = {}
     
     return render(request, 'staff/attendance.html', {
         'students': students,
         'classrooms': staff.classes.all(),
         'selected_classroom': classroom,
-        'selected_date': selected_date,
-        'attendance_data': attendance_data
+        'selected_date': selected_date
     })
 
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'staffprofile'))
+@role_required('staff')
 def staff_marks(request):
-    staff = request.user.staffprofile
+    staff = request.profile
     
     if request.method == 'POST':
         form = MarksEntryForm(staff, request.POST)
@@ -268,18 +424,74 @@ def staff_marks(request):
     else:
         form = MarksEntryForm(staff)
     
-    marks = Mark.objects.filter(entered_by=staff).order_by('-entered_at')
+    marks = paginate_keyset(
+        Mark.objects.filter(entered_by=staff).select_related('student__user', 'classroom'),
+        'entered_at', request.GET.get('cursor'), request.GET.get('per_page', DEFAULT_PAGE_SIZE)
+    )
+    if wants_json(request):
+        return keyset_json_response(marks, mark_json)
     
     return render(request, 'staff/marks.html', {
         'form': form,
         'marks': marks,
+        'page': marks,
         'classrooms': staff.classes.all()
     })
 
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'staffprofile'))
+@role_required('staff')
+def staff_gradebook(request):
+    staff = request.profile
+    classroom_id = request.GET.get('classroom')
+    gradebook = None
+    
+    if classroom_id:
+        classroom = get_object_or_404(ClassRoom, id=classroom_id)
+        if not staff.can_access(classroom.id):
+            messages.error(request, 'Access denied to this classroom')
+            return redirect('staff_gradebook')
+        gradebook = load_gradebook(classroom)
+    
+    return render(request, 'staff/gradebook.html', {
+        'gradebook': gradebook,
+        'classrooms': staff.classes.all(),
+        'selected_classroom': gradebook.classroom if gradebook else None
+    })
+
+@login_required
+@role_required('staff')
+def save_gradebook(request):
+    """Save only the gradebook cells changed in the browser, in one transaction."""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
+    
+    try:
+        data = json.loads(request.body)
+        classroom = ClassRoom.objects.get(id=data.get('classroom_id'))
+        changes = data.get('changes') or []
+        if not isinstance(changes, list) or not all(isinstance(change, dict) for change in changes):
+            raise ValueError('Changes must be a list of cells')
+    except ClassRoom.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Classroom not found'})
+    except (ValueError, TypeError, AttributeError) as e:
+        return JsonResponse({'success': False, 'error': f'Invalid request: {e}'})
+    
+    if not request.profile.can_access(classroom.id):
+        return JsonResponse({'success': False, 'error': 'Access denied to this classroom'})
+    
+    saved, cleared, errors = save_gradebook_changes(classroom, changes, entered_by=request.profile)
+    return JsonResponse({
+        'success': not errors,
+        'message': f'Saved {saved} and cleared {cleared} mark(s)',
+        'saved': saved,
+        'cleared': cleared,
+        'errors': errors
+    })
+
+@login_required
+@role_required('staff')
 def staff_announcements(request):
-    staff = request.user.staffprofile
+    staff = request.profile
     
     if request.method == 'POST':
         form = AnnouncementForm(staff, request.POST)
@@ -292,17 +504,23 @@ def staff_announcements(request):
     else:
         form = AnnouncementForm(staff)
     
-    announcements = Announcement.objects.filter(created_by=staff).order_by('-created_at')
+    announcements = paginate_keyset(
+        Announcement.objects.filter(created_by=staff).select_related('classroom', 'created_by__user'),
+        'created_at', request.GET.get('cursor'), request.GET.get('per_page', DEFAULT_PAGE_SIZE)
+    )
+    if wants_json(request):
+        return keyset_json_response(announcements, announcement_json)
     
     return render(request, 'staff/announcements.html', {
         'form': form,
-        'announcements': announcements
+        'announcements': announcements,
+        'page': announcements
     })
 
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'staffprofile'))
+@role_required('staff')
 def staff_lectures(request):
-    staff = request.user.staffprofile
+    staff = request.profile
 
     if request.method == 'POST':
         form = LectureForm(staff, request.POST, request.FILES)
@@ -315,53 +533,129 @@ def staff_lectures(request):
     else:
         form = LectureForm(staff)
     
-    lectures = Lecture.objects.filter(uploaded_by=staff).order_by('-uploaded_at')
-
-
+    lectures = paginate_keyset(
+        Lecture.objects.filter(uploaded_by=staff).select_related('classroom', 'uploaded_by__user'),
+        'uploaded_at', request.GET.get('cursor'), request.GET.get('per_page', DEFAULT_PAGE_SIZE)
+    )
+    if wants_json(request):
+        return keyset_json_response(lectures, lecture_json)
     
     return render(request, 'staff/lectures.html', {
         'form': form,
-        'lectures': lectures
+        'lectures': lectures,
+        'page': lectures,
+        'chunk_size': settings.LECTURE_UPLOAD_CHUNK_SIZE
     })
 
+def upload_status(upload):
+    return {
+        'success': True,
+        'upload_id': str(upload.id),
+        'offset': upload.received,
+        'size': upload.size,
+        'status': upload.status,
+        'chunk_size': settings.LECTURE_UPLOAD_CHUNK_SIZE,
+    }
+
+@login_required
+@role_required('staff')
+def lecture_upload_start(request):
+    """Begin a chunked lecture upload; the file follows as PUT requests."""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    
+    form = LectureUploadForm(request.profile, request.POST)
+    if not form.is_valid():
+        return JsonResponse({'success': False, 'error': form.errors}, status=400)
+    
+    upload = form.save(commit=False)
+    upload.uploaded_by = request.profile
+    start_upload(upload)
+    return JsonResponse(upload_status(upload), status=201)
+
+@login_required
+@role_required('staff')
+def lecture_upload_chunk(request, upload_id):
+    """GET reports progress, PUT ``?offset=N`` appends a chunk, DELETE abandons the upload."""
+    upload = get_object_or_404(LectureUpload, id=upload_id, uploaded_by=request.profile)
+    
+    if request.method == 'GET':
+        return JsonResponse(upload_status(upload))
+    if request.method == 'DELETE':
+        if upload.status != 'complete':
+            abort_upload(upload)
+        return JsonResponse({'success': True})
+    if request.method != 'PUT':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    
+    if upload.status == 'complete':
+        return JsonResponse({'success': False, 'error': 'Upload already finished'}, status=409)
+    try:
+        offset = int(request.GET.get('offset', ''))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        if offset < 0 or length <= 0:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'A non-negative offset and a request body are required'}, status=400)
+    
+    try:
+        write_chunk(upload, offset, request, length)
+    except UploadOffsetError as e:
+        return JsonResponse(dict(upload_status(upload), success=False, error=str(e)), status=409)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse(upload_status(upload))
+
+@login_required
+@role_required('staff')
+def lecture_upload_finish(request, upload_id):
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    
+    upload = get_object_or_404(LectureUpload, id=upload_id, uploaded_by=request.profile)
+    try:
+        lecture = finish_upload(upload)
+    except ValueError as e:
+        return JsonResponse(dict(upload_status(upload), success=False, error=str(e)), status=409)
+    return JsonResponse({'success': True, 'lecture': lecture_json(lecture)})
+
 
 # HOD Views
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'staffprofile') and u.staffprofile.is_hod)
+@role_required('hod')
 def hod_dashboard(request):
-    staff = request.user.staffprofile
+    staff = request.profile
     department = staff.department
     
-    # Department statistics
-    total_students = StudentProfile.objects.filter(department=department, is_approved=True).count()
-    total_staff = StaffProfile.objects.filter(department=department).count()
-    total_classes = ClassRoom.objects.filter(department=department).count()
+    # Department statistics, cached and shared by the whole department
+    stats = department_stats(department.id)
     
     # Recent activities
     recent_announcements = Announcement.objects.filter(
         created_by__department=department
     ).order_by('-created_at')[:5]
     
-    pending_approvals = StudentProfile.objects.filter(
-        department=department, 
-        is_approved=False
-    ).count()
+    # Flagged by the nightly detect_chronic_absence command
+    at_risk_students = AtRiskStudent.objects.filter(
+        classroom__department=department
+    ).select_related('student__user', 'classroom').order_by('-current_absence_run', 'recent_rate')
     
     context = {
         'department': department,
-        'total_students': total_students,
-        'total_staff': total_staff,
-        'total_classes': total_classes,
+        'total_students': stats['total_students'],
+        'total_staff': stats['total_staff'],
+        'total_classes': stats['total_classes'],
         'recent_announcements': recent_announcements,
-        'pending_approvals': pending_approvals,
+        'pending_approvals': stats['pending_approvals'],
+        'at_risk_students': at_risk_students,
     }
     
     return render(request, 'hod/dashboard.html', context)
 
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'staffprofile') and u.staffprofile.is_hod)
+@role_required('hod')
 def hod_reports(request):
-    staff = request.user.staffprofile
+    staff = request.profile
     department = staff.department
     
     if request.method == 'POST':
@@ -373,17 +667,73 @@ def hod_reports(request):
         if report_type == 'attendance':
             return generate_attendance_report(department, classroom_id, start_date, end_date)
         elif report_type == 'performance':
-            return generate_performance_report(department, classroom_id)
+            classroom = None
+            if classroom_id:
+                classroom = get_object_or_404(ClassRoom, id=classroom_id, department=department)
+            report = PerformanceReport.objects.create(
+                department=department,
+                classroom=classroom,
+                requested_by=staff
+            )
+            start_performance_report(report, created_by=request.user)
+            messages.success(request, 'Performance report is being generated. It will appear below when ready.')
+            return redirect('hod_reports')
     
     classrooms = ClassRoom.objects.filter(department=department)
+    reports = PerformanceReport.objects.filter(
+        department=department
+    ).select_related('classroom').order_by('-created_at')[:10]
+    
+    analytics_classroom = None
+    if request.GET.get('analytics_classroom'):
+        analytics_classroom = get_object_or_404(ClassRoom, id=request.GET['analytics_classroom'], department=department)
     
     return render(request, 'hod/reports.html', {
-        'classrooms': classrooms
+        'classrooms': classrooms,
+        'reports': reports,
+        'analytics': cached_marks_analytics(department, analytics_classroom),
+        'analytics_classroom': analytics_classroom
     })
 
+@login_required
+@role_required('hod')
+def download_report(request, report_id):
+    report = get_object_or_404(
+        PerformanceReport,
+        id=report_id,
+        department=request.profile.department,
+        status='done'
+    )
+    return FileResponse(report.file.open('rb'), as_attachment=True,
+                        filename=os.path.basename(report.file.name))
+
+@login_required
+@role_required('staff')
+def marks_analytics_api(request):
+    """Marks distributions and student rankings as JSON.
+
+    Staff may query their own classrooms; the whole department is HOD-only.
+    """
+    staff = request.profile
+    classroom = None
+    classroom_id = request.GET.get('classroom')
+    if classroom_id:
+        classroom = ClassRoom.objects.filter(id=classroom_id if classroom_id.isdigit() else None).first()
+        if classroom is None:
+            return JsonResponse({'success': False, 'error': 'Classroom not found'}, status=404)
+        if not staff.can_access(classroom.id) and not (staff.is_hod and classroom.department_id == staff.department_id):
+            return JsonResponse({'success': False, 'error': 'Access denied to this classroom'}, status=403)
+        department = classroom.department
+    elif staff.is_hod:
+        department = staff.department
+    else:
+        return JsonResponse({'success': False, 'error': 'Department statistics are available to the HOD only'}, status=403)
+    
+    return JsonResponse(dict(cached_marks_analytics(department, classroom), success=True))
+
 # API Views
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'staffprofile'))
+@role_required('staff')
 def mark_attendance(request):
     if request.method == 'POST':
         student_id = request.POST.get('student_id')
@@ -393,10 +743,10 @@ def mark_attendance(request):
         
         student = get_object_or_404(StudentProfile, id=student_id)
         classroom = get_object_or_404(ClassRoom, id=classroom_id)
-        staff = request.user.staffprofile
+        staff = request.profile
         
         # Check if staff has access to this classroom
-        if classroom not in staff.classes.all():
+        if not staff.can_access(classroom.id):
             return JsonResponse({'success': False, 'error': 'Access denied to this classroom'})
         
         attendance, created = Attendance.objects.get_or_create(
@@ -418,10 +768,10 @@ def mark_attendance(request):
     return JsonResponse({'success': False})
 
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'staffprofile'))
+@role_required('staff')
 def enter_marks(request):
     if request.method == 'POST':
-        staff = request.user.staffprofile
+        staff = request.profile
         
         # Get form data
         student_id = request.POST.get('student_id')
@@ -436,7 +786,7 @@ def enter_marks(request):
             classroom = ClassRoom.objects.get(id=classroom_id)
             
             # Check if staff has access to this classroom
-            if classroom not in staff.classes.all():
+            if not staff.can_access(classroom.id):
                 return JsonResponse({'success': False, 'error': 'Access denied to this classroom'})
             
             # Create or update mark
@@ -469,7 +819,48 @@ def enter_marks(request):
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
 @login_required
-@user_passes_test(lambda u: hasattr(u, 'staffprofile'))
+@role_required('staff')
+def enter_marks_bulk(request):
+    """Save a whole gradebook column (one subject and exam for a classroom) at once."""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
+    
+    classroom_id = request.POST.get('classroom_id')
+    subject = request.POST.get('subject', '').strip()
+    exam_type = request.POST.get('exam_type', '').strip()
+    maximum_marks = request.POST.get('maximum_marks', 100)
+    
+    if not subject or not exam_type:
+        return JsonResponse({'success': False, 'error': 'Subject and exam type are required'})
+    
+    try:
+        classroom = ClassRoom.objects.get(id=classroom_id)
+    except (ClassRoom.DoesNotExist, ValueError):
+        return JsonResponse({'success': False, 'error': 'Classroom not found'})
+    
+    if not request.profile.can_access(classroom.id):
+        return JsonResponse({'success': False, 'error': 'Access denied to this classroom'})
+    
+    entries, invalid_entries = parse_mark_entries(request.POST.getlist('marks'))
+    try:
+        results = bulk_upsert_marks(
+            classroom, subject, exam_type, entries,
+            entered_by=request.profile,
+            maximum_marks=maximum_marks
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+    
+    saved = sum(1 for result in results.values() if result in ('created', 'updated'))
+    return JsonResponse({
+        'success': True,
+        'message': f'Marks saved for {saved} student(s)',
+        'results': {str(student_id): result for student_id, result in results.items()},
+        'invalid_entries': invalid_entries
+    })
+
+@login_required
+@role_required('staff')
 def approve_student(request, student_id):
     if request.method == 'POST':
         student = get_object_or_404(StudentProfile, id=student_id)
@@ -481,82 +872,78 @@ def approve_student(request, student_id):
     
     return JsonResponse({'success': False})
 
+@login_required
+def job_status(request, job_id):
+    job = get_job(job_id)
+    if job is None or (job.created_by_id != request.user.id and not request.user.is_superuser):
+        return JsonResponse({'success': False, 'error': 'Job not found'}, status=404)
+    
+    return JsonResponse({
+        'success': True,
+        'job': {
+            'id': job.id,
+            'status': job.status,
+            'attempts': job.attempts,
+            'result': job.result,
+            'created_at': job.created_at.isoformat(),
+            'updated_at': job.updated_at.isoformat(),
+        }
+    })
+
 # Helper functions for reports
+class Echo:
+    """File-like object that hands back each written row for streaming."""
+    def write(self, value):
+        return value
+
 def generate_attendance_report(department, classroom_id, start_date, end_date):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="attendance_report_{datetime.now().strftime("%Y%m%d")}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Roll No', 'Student Name', 'Total Days', 'Present Days', 'Attendance %'])
-    
+    students = StudentProfile.objects.filter(
+        department=department, 
+        is_approved=True
+    )
     if classroom_id:
-        students = StudentProfile.objects.filter(
-            department=department, 
-            classroom_id=classroom_id,
-            is_approved=True
-        )
-    else:
-        students = StudentProfile.objects.filter(
-            department=department, 
-            is_approved=True
-        )
-    
-    for student in students:
-        total_days = Attendance.objects.filter(
-            student=student,
-            date__range=[start_date, end_date]
-        ).count()
-        
-        present_days = Attendance.objects.filter(
-            student=student,
-            date__range=[start_date, end_date],
-            status='P'
-        ).count()
-        
-        percentage = (present_days / total_days * 100) if total_days > 0 else 0
-        
-        writer.writerow([
-            student.roll_no,
-            student.user.get_full_name(),
-            total_days,
-            present_days,
-            f"{percentage:.2f}%"
-        ])
-    
-    return response
-
-def generate_performance_report(department, classroom_id):
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="performance_report_{datetime.now().strftime("%Y%m%d")}.pdf"'
+        students = students.filter(classroom_id=classroom_id)
     
-    p = canvas.Canvas(response)
-    p.drawString(100, 800, f"Performance Report - {department.name}")
-    p.drawString(100, 780, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    # Count present/total days for every student in a single grouped query
+    in_range = Q()
+    if start_date and end_date:
+        in_range = Q(attendance__date__range=[start_date, end_date])
+    students = students.select_related('user').annotate(
+        total_days=Count('attendance', filter=in_range),
+        present_days=Count('attendance', filter=in_range & Q(attendance__status='P'))
+    ).order_by('roll_no')
     
+    # Days of compacted academic years, counted from their bitsets
+    archive_filters = {'student__department': department}
     if classroom_id:
-        classroom = ClassRoom.objects.get(id=classroom_id)
-        p.drawString(100, 760, f"Class: {classroom.name}")
-        students = StudentProfile.objects.filter(
-            department=department, 
-            classroom=classroom,
-            is_approved=True
-        )
-    else:
-        students = StudentProfile.objects.filter(
-            department=department, 
-            is_approved=True
-        )
+        archive_filters['student__classroom_id'] = classroom_id
+    archive_start = parse_date(start_date) if start_date and end_date else None
+    archive_end = parse_date(end_date) if start_date and end_date else None
+    archived = archived_totals(
+        archive_start, archive_end,
+        # Days rewritten after compaction are already counted live
+        live_days=live_attendance_days(archive_start, archive_end, **archive_filters),
+        **archive_filters
+    )
     
-    y_position = 740
-    for student in students[:20]:  # Limit to first 20 students for demo
-        avg_marks = Mark.objects.filter(student=student).aggregate(avg=Avg('marks_obtained'))['avg'] or 0
-        p.drawString(100, y_position, f"{student.roll_no} - {student.user.get_full_name()}: {avg_marks:.2f}%")
-        y_position -= 20
-        if y_position < 100:
-            p.showPage()
-            y_position = 800
+    def rows():
+        writer = csv.writer(Echo())
+        yield writer.writerow(['Roll No', 'Student Name', 'Total Days', 'Present Days', 'Attendance %'])
+        for student in students.iterator(chunk_size=500):
+            archived_present, archived_total = archived.get(student.id, (0, 0))
+            total_days = student.total_days + archived_total
+            present_days = student.present_days + archived_present
+            percentage = (present_days / total_days * 100) if total_days > 0 else 0
+            yield writer.writerow([
+                student.roll_no,
+                student.user.get_full_name(),
+                total_days,
+                present_days,
+                f"{percentage:.2f}%"
+            ])
     
-    p.save()
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="attendance_report_{datetime.now().strftime("%Y%m%d")}.csv"'
     return response
 
 from django.http import JsonResponse
@@ -624,6 +1011,7 @@ from django.views.decorators.csrf import csrf_exempt
 import json
 from django.utils.dateparse import parse_date
 from .models import Attendance, StudentProfile, ClassRoom
+from .attendance import bulk_mark_attendance, parse_student_entries, roster_with_attendance
 
 def mark_attendance(request):
     if request.method == 'POST':
@@ -637,31 +1025,28 @@ def mark_attendance(request):
             if not date:
                 return JsonResponse({'success': False, 'error': 'Invalid date format'})
             
+            # Check if staff has access to this classroom
+            if request.role not in ('staff', 'hod') or not request.profile.can_access(classroom_id):
+                return JsonResponse({'success': False, 'error': 'Access denied to this classroom'})
+            
             # Get classroom
             classroom = ClassRoom.objects.get(id=classroom_id)
             
-            # Process each student's attendance
-            for student_data in students_data:
-                if ':' in student_data:
-                    student_id, status = student_data.split(':', 1)
-                    
-                    # Get student
-                    student = StudentProfile.objects.get(id=student_id)
-                    
-                    # Create or update attendance record
-                    attendance, created = Attendance.objects.update_or_create(
-                        student=student,
-                        classroom=classroom,
-                        date=date,
-                        defaults={'status': status}
-                    )
+            # Validate the roster and upsert every row in one go
+            entries, invalid_entries = parse_student_entries(students_data)
+            marked_by = request.user if request.user.is_authenticated else None
+            results = bulk_mark_attendance(classroom, date, entries, marked_by=marked_by)
             
-            return JsonResponse({'success': True, 'message': 'Attendance saved successfully'})
+            saved = sum(1 for result in results.values() if result in ('created', 'updated'))
+            return JsonResponse({
+                'success': True,
+                'message': f'Attendance saved for {saved} student(s)',
+                'results': {str(student_id): result for student_id, result in results.items()},
+                'invalid_entries': invalid_entries
+            })
             
         except ClassRoom.DoesNotExist:
             return JsonResponse({'success': False, 'error': 'Classroom not found'})
-        except StudentProfile.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Student not found'})
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)})
     
@@ -671,12 +1056,10 @@ def attendance_view(request):
     classrooms = ClassRoom.objects.all()
     selected_classroom = None
     students = []
-    attendance_records = []
     selected_date = request.GET.get('date')
     
     # Set default date to today if not provided
     if not selected_date:
-        from datetime import date
         selected_date = date.today().isoformat()
     
     # Get selected classroom
@@ -684,15 +1067,10 @@ def attendance_view(request):
     if classroom_id:
         try:
             selected_classroom = ClassRoom.objects.get(id=classroom_id)
-            students = StudentProfile.objects.filter(classroom=selected_classroom, is_approved=True)
             
-            # Get existing attendance records for the selected date
-            date_obj = parse_date(selected_date)
-            if date_obj:
-                attendance_records = Attendance.objects.filter(
-                    classroom=selected_classroom,
-                    date=date_obj
-                )
+            # Students with their existing attendance for the selected date
+            date_obj = parse_date(selected_date) or date.today()
+            students = roster_with_attendance(selected_classroom, date_obj)
         except ClassRoom.DoesNotExist:
             pass
     
@@ -700,7 +1078,6 @@ def attendance_view(request):
         'classrooms': classrooms,
         'selected_classroom': selected_classroom,
         'students': students,
-        'attendance_records': attendance_records,
         'selected_date': selected_date,
     }
     return render(request, 'staff/attendance.html', context)
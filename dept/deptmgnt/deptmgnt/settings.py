@@ -26,6 +26,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'dept.middleware.RoleMiddleware',
+    'dept.middleware.SlidingSessionMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -103,9 +105,16 @@ LOGIN_URL = 'login'
 LOGOUT_REDIRECT_URL = 'home'  # Add this line
 
 # Session settings
+# Sessions are read from the cache and written through to the database;
+# use 'django.contrib.sessions.backends.signed_cookies' to keep them
+# entirely client side.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 SESSION_COOKIE_AGE = 1209600  # 2 weeks in seconds
-SESSION_SAVE_EVERY_REQUEST = True
+SESSION_SAVE_EVERY_REQUEST = False
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
+# Sliding expiry without a save per request (see SlidingSessionMiddleware):
+# re-save once this fraction of SESSION_COOKIE_AGE has passed since the last save
+SESSION_REFRESH_AFTER = 0.1
 
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
@@ -115,6 +124,46 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Chunked lecture uploads (see dept.uploads); partial files are kept outside
+# MEDIA_ROOT so they are never served
+LECTURE_UPLOAD_DIR = BASE_DIR / 'chunked_uploads'
+LECTURE_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # 4MB per PUT
+LECTURE_MAX_UPLOAD_SIZE = 2 * 1024 * 1024 * 1024  # 2GB
+
+# How lecture downloads are transferred once access is checked:
+#   None                - Django streams the file (sendfile where the server supports it)
+#   'x-accel-redirect'  - nginx, with an internal location at PROTECTED_MEDIA_INTERNAL_URL
+#                         aliased to MEDIA_ROOT
+#   'x-sendfile'        - Apache mod_xsendfile or lighttpd
+PROTECTED_MEDIA_SENDFILE = None
+PROTECTED_MEDIA_INTERNAL_URL = '/protected-media/'
+
+# Academic years run from the first of this month (June) to the end of the
+# month before it; compact_attendance archives each year by these dates
+ACADEMIC_YEAR_START_MONTH = 6
+
+# Cache settings
+# Use a shared backend (Redis, Memcached) when running several worker
+# processes so that cache invalidation reaches all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Live announcement feed. The stream holds its connection open, so only
+# enable it when serving through deptmgnt.asgi; under WSGI every open page
+# would pin a worker. Without it the feed endpoint answers once and closes,
+# asking clients to reconnect after ANNOUNCEMENT_RETRY_SECONDS.
+ANNOUNCEMENT_STREAMING = False
+ANNOUNCEMENT_RETRY_SECONDS = 60
+
+# Seconds between checks for new announcements in the live feed
+ANNOUNCEMENT_POLL_INTERVAL = 5
+
+# Report generation settings
+REPORT_WORKERS = 4  # Processes used to render PDF reports
+
 import os
 from pathlib import Path
 